@@ -1,58 +1,178 @@
-from flask import Flask, render_template, jsonify, request, send_file, send_from_directory, session
+from flask import Flask, Response, render_template, jsonify, request, send_file, send_from_directory, session
 from flask_cors import CORS
 import os
-import json
+import hashlib
+import time
+import orjson
+import threading
+import httpx
 from datetime import datetime, timedelta
+from decimal import Decimal
+from cachetools import LRUCache, TTLCache
 from openai import OpenAI
+from flask.json.provider import JSONProvider
+from flask.sessions import SecureCookieSessionInterface
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
+from urllib.parse import quote
 import uuid
-from functools import wraps
+import secrets
+from functools import wraps, lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice, product
+from types import MappingProxyType
+from importlib.util import find_spec
 import database
 import file_parser
 import health_plan_creator
 import device_integrations
 
+class ScopedSessionInterface(SecureCookieSessionInterface):
+    """Only open the cookie session on routes that use it (device OAuth state)"""
+    session_path_prefixes = ('/api/devices/',)
+    
+    def open_session(self, app, request):
+        if not request.path.startswith(self.session_path_prefixes):
+            return self.make_null_session(app)
+        return super().open_session(app, request)
+
+# Non-string dict keys (e.g. int ids) and numpy values from the pandas parsers serialize natively
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def orjson_default(obj):
+    """Encode the few types orjson does not handle natively"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', 'replace')
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def json_bytes(obj):
+    """Serialize to UTF-8 JSON bytes with the app-wide orjson options"""
+    return orjson.dumps(obj, default=orjson_default, option=ORJSON_OPTIONS)
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson, which encodes straight to UTF-8 bytes in C"""
+    
+    def dumps(self, obj, **kwargs):
+        return json_bytes(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(json_bytes(obj), mimetype='application/json')
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-this-in-production')
+app.session_interface = ScopedSessionInterface()
 CORS(app, supports_credentials=True)
 
 # Configuration
 CONTENT_DIR = 'Content'
+CONTENT_LIST_TTL = 2  # seconds a directory scan is reused while Content/ is unchanged
+CONTENT_ACCEL_PREFIX = os.environ.get('CONTENT_ACCEL_PREFIX')  # e.g. /internal-content/ when nginx serves Content/
+PROMPT_CONTEXT_TTL = 60  # seconds formatted AI prompt context is reused; local writes invalidate it sooner
+AI_RESPONSE_TTL = 120  # seconds an identical AI question is answered from cache while data is unchanged
+SESSION_CACHE_TTL = 30  # seconds a verified session is trusted without hitting the database
+CGM_STATS_MAX_AGE = 30  # seconds clients may reuse /api/cgm/stats
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+OPENAI_TIMEOUT = 60  # seconds per upstream call
+OPENAI_MAX_RETRIES = 2  # retried on connection errors, 408/409/429 and 5xx (including 524)
 
 # Initialize OpenAI client (only if API key is provided)
 client = None
 if OPENAI_API_KEY:
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
+        # One pooled HTTP client per worker so TCP/TLS connections are reused across requests;
+        # under gevent its blocking I/O yields to other greenlets
+        client = OpenAI(
+            api_key=OPENAI_API_KEY,
+            timeout=OPENAI_TIMEOUT,
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=httpx.Client(
+                http2=find_spec('h2') is not None,  # multiplex over one connection when httpx[http2] is installed
+                timeout=OPENAI_TIMEOUT,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=100, keepalive_expiry=30)
+            )
+        )
     except Exception as e:
-        print(f"Warning: Could not initialize OpenAI client: {e}")
+        app.logger.warning("Could not initialize OpenAI client: %s", e)
         client = None
 
+def warm_openai_connection():
+    """Open the pooled TLS connection before the first user query needs it"""
+    try:
+        client.models.list()
+    except Exception as e:
+        app.logger.warning("OpenAI connection warm-up failed: %s", e)
+
+if client:
+    threading.Thread(target=warm_openai_connection, daemon=True).start()
+
 # Ensure content directory exists
 os.makedirs(CONTENT_DIR, exist_ok=True)
 
-# Initialize database
-database.init_database()
+def parse_content_files():
+    """Parse the Excel files in Content/ and populate the database"""
+    try:
+        file_parser.parse_all_files()
+    except Exception as e:
+        app.logger.warning("Could not parse files on startup: %s", e)
+    mark_data_changed()
+
+def init_health_plan():
+    """Create the health plan on first start"""
+    try:
+        health_plan_creator.ensure_health_plan()
+    except Exception as e:
+        app.logger.warning("Could not initialize health plan: %s", e)
+
+# Under gunicorn the master prepares the database once before forking (see gunicorn.conf.py),
+# so workers only do it when started some other way
+STARTUP_DATA_READY = os.environ.get('STARTUP_DATA_READY') == '1'
+if not STARTUP_DATA_READY:
+    database.init_database()
+    init_health_plan()
 
-# Parse Excel files and populate database on startup
-try:
-    file_parser.parse_all_files()
-except Exception as e:
-    print(f"Warning: Could not parse files on startup: {e}")
+# Each worker purges expired sessions on a timer rather than during login
+database.schedule_session_cleanup()
 
-# Initialize health plan on startup
-try:
-    # Check if health plan exists, if not create it
-    with database.get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) as count FROM health_goals')
-        count = cursor.fetchone()['count']
-        if count == 0:
-            health_plan_creator.create_health_plan()
-            print("Health plan initialized")
-except Exception as e:
-    print(f"Warning: Could not initialize health plan: {e}")
+# Verified sessions cached in-process as (username, expires_at); logout evicts, and revocation
+# by other workers is picked up within the TTL
+_session_cache = TTLCache(maxsize=10_000, ttl=SESSION_CACHE_TTL)
+_session_cache_lock = threading.Lock()
+
+def session_cache_key(session_id):
+    """Key cache entries by a digest so raw session ids are not held in memory"""
+    return hashlib.blake2s(session_id.encode(), digest_size=16).digest()
+
+def verify_session_cached(session_id):
+    """Return the session's username, checking the in-process cache before SQLite"""
+    key = session_cache_key(session_id)
+    with _session_cache_lock:
+        session = _session_cache.get(key)
+    if session is None:
+        session = database.get_session(session_id)
+        if session is None:
+            return None
+        with _session_cache_lock:
+            _session_cache[key] = session
+    username, expires_at = session
+    # A cached session may expire before its cache entry does
+    if expires_at <= database.session_timestamp():
+        forget_session(session_id)
+        return None
+    return username
+
+def forget_session(session_id):
+    """Drop a session from the in-process cache"""
+    with _session_cache_lock:
+        _session_cache.pop(session_cache_key(session_id), None)
 
 # Authentication decorator
 def require_auth(f):
@@ -63,7 +183,7 @@ def require_auth(f):
         if not session_id:
             return jsonify({'success': False, 'error': 'Authentication required', 'auth_required': True}), 401
         
-        username = database.verify_session(session_id)
+        username = verify_session_cached(session_id)
         if not username:
             return jsonify({'success': False, 'error': 'Invalid or expired session', 'auth_required': True}), 401
         
@@ -71,74 +191,301 @@ def require_auth(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def require_ai_client(f):
+    """Decorator that returns 503 before any other work when OpenAI is not configured"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not client:
+            return jsonify({
+                'success': False, 
+                'error': 'OpenAI API key not configured. Please set OPENAI_API_KEY environment variable.'
+            }), 503
+        return f(*args, **kwargs)
+    return decorated_function
+
+@lru_cache(maxsize=1)
+def month_key_for_minute(minute_bucket):
+    """Month key (YYYY-MM) for an epoch-minute bucket"""
+    return datetime.fromtimestamp(minute_bucket * 60).strftime('%Y-%m')
+
 def get_current_month_key():
-    """Get current month key in YYYY-MM format"""
-    return datetime.now().strftime('%Y-%m')
+    """Get current month key in YYYY-MM format, formatted at most once a minute"""
+    return month_key_for_minute(int(time.time()) // 60)
+
+@lru_cache(maxsize=1)
+def date_for_minute(minute_bucket):
+    """ISO date (YYYY-MM-DD) for an epoch-minute bucket"""
+    return datetime.fromtimestamp(minute_bucket * 60).date().isoformat()
+
+def get_today():
+    """Get today's ISO date, formatted at most once a minute"""
+    return date_for_minute(int(time.time()) // 60)
+
+@lru_cache(maxsize=16)
+def cgm_window_start(minute_bucket, days):
+    """First CGM rollup hour_bucket (YYYY-MM-DDTHH) of a window of days ending at an epoch-minute bucket"""
+    return (datetime.fromtimestamp(minute_bucket * 60) - timedelta(days=days)).strftime('%Y-%m-%dT%H')
+
+_content_files = (None, 0.0, [])  # (directory mtime_ns, scanned at, files)
+
+def list_content_files():
+    """List files in CONTENT_DIR, reusing a recent scan while the directory is unchanged"""
+    global _content_files
+    mtime = os.stat(CONTENT_DIR).st_mtime_ns
+    cached_mtime, scanned_at, files = _content_files
+    now = time.monotonic()
+    if cached_mtime == mtime and now - scanned_at < CONTENT_LIST_TTL:
+        return files
+    
+    files = []
+    fromtimestamp = datetime.fromtimestamp  # bound once for the loop
+    with os.scandir(CONTENT_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            files.append({
+                'name': entry.name,
+                'size': stat.st_size,
+                'modified': fromtimestamp(stat.st_mtime)  # the orjson provider emits ISO 8601
+            })
+    _content_files = (mtime, now, files)
+    return files
+
+# (title, query, fallback) sections of the data context in each AI prompt, limited to what the prompt uses
+AI_QUERY_CONTEXT = (
+    ('Health Tracking Data (Recent)', 'SELECT date, weight, blood_pressure, blood_sugar, sleep_hours, exercise_minutes FROM health_tracker_data ORDER BY date DESC LIMIT 10', 'No health data available'),
+    ('Diet Plan Data', 'SELECT day, meal_type, food_item, calories, protein, carbs FROM diet_plan LIMIT 20', 'No diet data available'),
+    ('Exercise Plan Data', 'SELECT day, exercise_name, duration_minutes, sets, reps FROM exercise_plan LIMIT 20', 'No exercise data available'),
+)
+REPORT_CONTEXT = (
+    ('Health Tracker Data (Recent 30 entries)', 'SELECT * FROM health_tracker_data ORDER BY date DESC LIMIT 30', 'No health data available'),
+    ('Diet Plan Data', 'SELECT * FROM diet_plan LIMIT 30', 'No diet data available'),
+    ('Exercise Plan Data', 'SELECT * FROM exercise_plan LIMIT 30', 'No exercise data available'),
+)
+
+# System messages are fixed per category, so build them once at import (read-only)
+AI_SYSTEM_MESSAGES = MappingProxyType({
+    'health': {"role": "system", "content": "You are a health and medical tracking assistant. Provide expert advice on health metrics, blood pressure, blood sugar, weight management, and overall health monitoring."},
+    'food': {"role": "system", "content": "You are a nutrition and diet planning assistant. Provide expert advice on meal planning, nutrition, calories, macronutrients (protein, carbs, fats), and healthy eating habits."},
+    'lifestyle': {"role": "system", "content": "You are a lifestyle and wellness assistant. Provide expert advice on sleep patterns, daily routines, work-life balance, stress management, and overall lifestyle optimization."},
+    'fitness': {"role": "system", "content": "You are a fitness and exercise planning assistant. Provide expert advice on workout routines, exercise techniques, training schedules, and fitness goals."}
+})
+REPORT_SYSTEM_MESSAGE = {"role": "system", "content": "You are a health tracking assistant. Generate detailed, professional health reports with insights, trends, and recommendations."}
+
+def build_prompt_context(conn, sections):
+    """Run each section's query and render the whole data context of a prompt as one string"""
+    parts = []
+    cursor = conn.cursor()
+    for title, sql, fallback in sections:
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        if rows:
+            # Column names once, then one compact JSON array per row: far fewer tokens than repeating keys
+            columns = [column[0] for column in cursor.description]
+            body = b'\n'.join([json_bytes(columns), *(json_bytes(tuple(row)) for row in rows)]).decode()
+        else:
+            body = fallback
+        parts.append(f'{title}:\n{body}')
+    return '\n\n'.join(parts)
+
+# Rendered data context keyed by its sections tuple; the tables change on the order of minutes
+_prompt_context_cache = TTLCache(maxsize=8, ttl=PROMPT_CONTEXT_TTL)
+_prompt_context_lock = threading.Lock()
+
+def cached_prompt_context(sections, conn=None):
+    """Return the rendered data context, rebuilding it at most once per TTL"""
+    with _prompt_context_lock:
+        context = _prompt_context_cache.get(sections)
+    if context is None:
+        if conn is not None:
+            context = build_prompt_context(conn, sections)
+        else:
+            with database.get_db() as conn:
+                context = build_prompt_context(conn, sections)
+        with _prompt_context_lock:
+            _prompt_context_cache[sections] = context
+    return context
+
+# Finished AI answers keyed by (question digest, data version); writes that feed the prompts bump
+# the version. The version is per worker process, so other workers converge within the TTL.
+_ai_response_cache = TTLCache(maxsize=512, ttl=AI_RESPONSE_TTL)
+_ai_response_lock = threading.Lock()
+data_version = 0
+
+def mark_data_changed():
+    """Invalidate cached AI context and answers after a write to data the prompts include"""
+    global data_version
+    with _ai_response_lock:
+        data_version += 1
+    with _prompt_context_lock:
+        _prompt_context_cache.clear()
+
+def ai_response_cache_key(category, query):
+    """Cache key for an AI answer to this question against the current data"""
+    digest = hashlib.blake2b(f'{category}\0{query}'.encode(), digest_size=16).digest()
+    return digest, data_version
+
+def cache_ai_response(key, text):
+    """Store a finished AI answer under its cache key"""
+    with _ai_response_lock:
+        _ai_response_cache[key] = text
+
+def iter_row_dicts(cursor):
+    """Lazily yield the executed query's rows as dicts keyed by its selected column names"""
+    columns = tuple(column[0] for column in cursor.description)
+    return (dict(zip(columns, row)) for row in cursor)
+
+def rows_as_dicts(cursor):
+    """Materialize the executed query's rows as dicts keyed by its selected column names"""
+    return list(iter_row_dicts(cursor))
+
+def stream_json_array(key, items, batch_size=500):
+    """Yield {"success": true, key: [...]} incrementally, encoding items in batches"""
+    items = iter(items)
+    yield b'{"success":true,' + orjson.dumps(key) + b':['
+    separator = b''
+    while batch := list(islice(items, batch_size)):
+        yield separator + b','.join(map(json_bytes, batch))
+        separator = b','
+    yield b']}'
+
+# Serialized plan responses keyed by ETag; the plans change only on re-parse or a health plan edit
+_plan_response_cache = LRUCache(maxsize=16)
+_plan_response_lock = threading.Lock()
+
+def fingerprinted_response(conn, fingerprint, query, params=(), key='data'):
+    """JSON rows answering 304, or a cached body, while the given fingerprint of their source is unchanged"""
+    etag = hashlib.blake2s(fingerprint.encode(), digest_size=8).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    with _plan_response_lock:
+        body = _plan_response_cache.get(etag)
+    if body is None:
+        body = json_bytes({'success': True, key: rows_as_dicts(conn.execute(query, params))})
+        with _plan_response_lock:
+            _plan_response_cache[etag] = body
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag, weak=True)
+    return response
+
+def plan_response(table, query):
+    """JSON rows of a rarely-changing plan table, fingerprinted by its row count and highest rowid"""
+    with database.get_db() as conn:
+        count, max_rowid = conn.execute(f'SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM {table}').fetchone()
+        # Plan ids are AUTOINCREMENT, so a re-parse (delete and re-insert) always raises MAX(rowid);
+        # reading only the database keeps the ETag identical across workers
+        return fingerprinted_response(conn, f'{table}:{count}:{max_rowid}', query)
+
+def primed(chunks):
+    """Run a response generator up to its first chunk so setup errors raise before streaming"""
+    first = next(chunks)
+    def stream():
+        yield first
+        yield from chunks
+    return stream()
+
+# Server-Sent Events helpers for streaming OpenAI completions
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def wants_stream():
+    """Stream by default; ?stream=0 keeps the single JSON response"""
+    return request.args.get('stream', '1') != '0'
+
+def sse_event(payload):
+    """Format a payload as a single SSE data event"""
+    return b'data: ' + json_bytes(payload) + b'\n\n'
+
+def stream_completion(response, done_payload, on_complete=None):
+    """Forward completion tokens as they arrive, then a final done event"""
+    try:
+        parts = []
+        for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield sse_event({'token': delta})
+        if on_complete:
+            on_complete(''.join(parts))
+        yield sse_event(dict(done_payload, done=True))
+    except Exception as e:
+        yield sse_event({'done': True, 'success': False, 'error': str(e)})
 
 @app.route('/')
 def index():
     """Serve the main page"""
     return render_template('index.html')
 
+@app.route('/api/files', methods=['GET'])
+def get_files():
+    """Get list of all files in the Content directory (public read access)"""
+    try:
+        return jsonify({'success': True, 'files': list_content_files()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/files/<filename>', methods=['GET'])
+def download_file(filename):
+    """Download a file from the Content directory (public read access)"""
+    # safe_join rejects traversal but, unlike secure_filename, keeps names with spaces intact
+    path = safe_join(CONTENT_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'success': False, 'error': 'File not found'}), 404
+    
+    # Behind nginx, hand the transfer off to an internal location and return immediately
+    if CONTENT_ACCEL_PREFIX:
+        response = Response(mimetype='application/octet-stream')
+        response.headers['X-Accel-Redirect'] = CONTENT_ACCEL_PREFIX.rstrip('/') + '/' + quote(filename)
+        response.headers.set('Content-Disposition', 'attachment', filename=filename)
+        return response
+    
+    # Conditional GET (ETag/Last-Modified -> 304) and Range requests; the body goes out via sendfile
+    return send_from_directory(CONTENT_DIR, filename, as_attachment=True, conditional=True, etag=True)
+
 # Health Data CRUD Endpoints
-@app.route('/api/health-data', methods=['GET', 'POST'])
-def health_data():
-    """Get all health tracker data (GET) or add new data (POST)"""
-    if request.method == 'GET':
-        try:
-            with database.get_db() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id, date, weight, blood_pressure, blood_sugar, sleep_hours, exercise_minutes, notes
-                    FROM health_tracker_data
-                    ORDER BY date DESC
-                ''')
-                rows = cursor.fetchall()
-                data = []
-                for row in rows:
-                    data.append({
-                        'id': row['id'],
-                        'date': row['date'],
-                        'weight': row['weight'],
-                        'blood_pressure': row['blood_pressure'],
-                        'blood_sugar': row['blood_sugar'],
-                        'sleep_hours': row['sleep_hours'],
-                        'exercise_minutes': row['exercise_minutes'],
-                        'notes': row['notes']
-                    })
-                return jsonify({'success': True, 'data': data})
-        except Exception as e:
-            return jsonify({'success': False, 'error': str(e)}), 500
-    else:  # POST
-        # Check authentication for POST
-        session_id = request.headers.get('X-Session-ID') or request.cookies.get('session_id')
-        if not session_id:
-            return jsonify({'success': False, 'error': 'Authentication required', 'auth_required': True}), 401
-        
-        username = database.verify_session(session_id)
-        if not username:
-            return jsonify({'success': False, 'error': 'Invalid or expired session', 'auth_required': True}), 401
-        
-        try:
-            data = request.json
-            with database.get_db() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO health_tracker_data 
-                    (date, weight, blood_pressure, blood_sugar, sleep_hours, exercise_minutes, notes)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    data.get('date'),
-                    data.get('weight'),
-                    data.get('blood_pressure'),
-                    data.get('blood_sugar'),
-                    data.get('sleep_hours'),
-                    data.get('exercise_minutes'),
-                    data.get('notes')
-                ))
-            return jsonify({'success': True})
-        except Exception as e:
-            return jsonify({'success': False, 'error': str(e)}), 500
+@app.route('/api/health-data', methods=['GET'])
+def get_health_data():
+    """Get all health tracker data (public read access)"""
+    try:
+        with database.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, date, weight, blood_pressure, blood_sugar, sleep_hours, exercise_minutes, notes
+                FROM health_tracker_data
+                ORDER BY date DESC
+            ''')
+            data = rows_as_dicts(cursor)
+            return jsonify({'success': True, 'data': data})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/health-data', methods=['POST'])
+@require_auth
+def add_health_data():
+    """Add new health tracker data (requires authentication)"""
+    try:
+        data = request.json
+        with database.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO health_tracker_data 
+                (date, weight, blood_pressure, blood_sugar, sleep_hours, exercise_minutes, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                data.get('date'),
+                data.get('weight'),
+                data.get('blood_pressure'),
+                data.get('blood_sugar'),
+                data.get('sleep_hours'),
+                data.get('exercise_minutes'),
+                data.get('notes')
+            ))
+        mark_data_changed()
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/health-data/<int:data_id>', methods=['PUT'])
 @require_auth
@@ -162,6 +509,7 @@ def update_health_data(data_id):
                 data.get('notes'),
                 data_id
             ))
+        mark_data_changed()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -174,6 +522,7 @@ def delete_health_data(data_id):
         with database.get_db() as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM health_tracker_data WHERE id=?', (data_id,))
+        mark_data_changed()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -193,7 +542,6 @@ def login():
         
         if database.authenticate_user(username, password, email):
             session_id = database.create_session(username)
-            database.cleanup_expired_sessions()
             return jsonify({
                 'success': True,
                 'session_id': session_id,
@@ -210,6 +558,7 @@ def logout():
     try:
         session_id = request.headers.get('X-Session-ID') or request.cookies.get('session_id')
         if session_id:
+            forget_session(session_id)
             database.delete_session(session_id)
         return jsonify({'success': True})
     except Exception as e:
@@ -221,7 +570,7 @@ def check_auth():
     try:
         session_id = request.headers.get('X-Session-ID') or request.cookies.get('session_id')
         if session_id:
-            username = database.verify_session(session_id)
+            username = verify_session_cached(session_id)
             if username:
                 return jsonify({'success': True, 'authenticated': True, 'username': username})
         return jsonify({'success': True, 'authenticated': False})
@@ -230,32 +579,33 @@ def check_auth():
 
 @app.route('/api/comments', methods=['GET'])
 def get_comments():
-    """Get all comments (public read access)"""
-    try:
+    """Get all comments grouped by filename (public read access)"""
+    def generate():
         with database.get_db() as conn:
             cursor = conn.cursor()
+            cursor.arraysize = 500
+            # SQLite builds each file's JSON array; newest file and comment first
             cursor.execute('''
-                SELECT id, filename, author, comment, created_at, created_by
-                FROM comments
-                ORDER BY created_at DESC
+                SELECT filename, json_group_array(json_object(
+                    'id', id, 'author', author, 'comment', comment,
+                    'timestamp', created_at, 'created_by', created_by
+                ))
+                FROM (SELECT * FROM comments ORDER BY created_at DESC)
+                GROUP BY filename
+                ORDER BY MAX(created_at) DESC
             ''')
-            rows = cursor.fetchall()
-            
-            # Group by filename
-            comments = {}
-            for row in rows:
-                filename = row['filename']
-                if filename not in comments:
-                    comments[filename] = []
-                comments[filename].append({
-                    'id': row['id'],
-                    'author': row['author'],
-                    'comment': row['comment'],
-                    'timestamp': row['created_at'],
-                    'created_by': row['created_by']
-                })
-            
-            return jsonify({'success': True, 'comments': comments})
+            # Emit bytes, one chunk per fetchmany batch, so Werkzeug writes them without re-encoding
+            yield b'{"success":true,"comments":{'
+            separator = b''
+            while rows := cursor.fetchmany():
+                yield separator + b','.join(
+                    orjson.dumps(filename) + b':' + file_comments.encode() for filename, file_comments in rows
+                )
+                separator = b','
+            yield b'}}'
+    
+    try:
+        return Response(primed(generate()), mimetype='application/json')
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -272,7 +622,7 @@ def add_comment():
         if not filename or not comment_text:
             return jsonify({'success': False, 'error': 'Filename and comment are required'}), 400
         
-        comment_id = str(uuid.uuid4())
+        comment_id = secrets.token_urlsafe(16)
         username = getattr(request, 'current_user', 'admin')
         
         with database.get_db() as conn:
@@ -288,7 +638,7 @@ def add_comment():
                 'id': comment_id,
                 'author': author,
                 'comment': comment_text,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': datetime.now(),
                 'created_by': username
             }
         })
@@ -307,31 +657,94 @@ def delete_comment(comment_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Largest batch accepted by the batch endpoints; keeps DELETE ... IN (?, ...) well under
+# SQLite's bound-variable limit (999 on older builds)
+MAX_BATCH_SIZE = 500
+
+def batch_items(payload, key):
+    """Return the request's item dicts (under 'items' or key), or None if they are malformed"""
+    if not isinstance(payload, dict):
+        return None
+    items = payload.get('items') or payload.get(key)
+    if (not isinstance(items, list) or not items or len(items) > MAX_BATCH_SIZE
+            or not all(isinstance(item, dict) for item in items)):
+        return None
+    return items
+
+def batch_ids(payload):
+    """Return the request's ids, or None unless they are a non-empty list of ints/strings"""
+    ids = payload.get('ids') if isinstance(payload, dict) else None
+    if (not isinstance(ids, list) or not ids or len(ids) > MAX_BATCH_SIZE
+            or not all(isinstance(i, (int, str)) and not isinstance(i, bool) for i in ids)):
+        return None
+    return ids
+
+@app.route('/api/comments/batch', methods=['POST'])
+@app.route('/api/comments/bulk', methods=['POST'])
+@require_auth
+def add_comments_batch():
+    """Add many comments in one transaction (requires authentication)"""
+    try:
+        items = batch_items(request.get_json(silent=True) or {}, 'comments')
+        if items is None:
+            return jsonify({'success': False, 'error': f'items must be a list of 1-{MAX_BATCH_SIZE} objects'}), 400
+        
+        username = getattr(request, 'current_user', 'admin')
+        timestamp = datetime.now()
+        comments = []
+        rows = []
+        for index, item in enumerate(items):
+            filename = item.get('filename')
+            comment_text = item.get('comment')
+            if not filename or not comment_text:
+                return jsonify({'success': False, 'error': f'Item {index}: filename and comment are required'}), 400
+            
+            comment = {
+                'id': secrets.token_urlsafe(16),
+                'filename': filename,
+                'author': item.get('author', 'Anonymous'),
+                'comment': comment_text,
+                'timestamp': timestamp,
+                'created_by': username
+            }
+            comments.append(comment)
+            rows.append((comment['id'], filename, comment['author'], comment_text, username))
+        
+        with database.get_db() as conn:
+            conn.executemany('''
+                INSERT INTO comments (id, filename, author, comment, created_by)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+        
+        return jsonify({'success': True, 'comments': comments})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/comments/batch', methods=['DELETE'])
+@require_auth
+def delete_comments_batch():
+    """Delete many comments in one statement (requires authentication)"""
+    try:
+        ids = batch_ids(request.get_json(silent=True) or {})
+        if ids is None:
+            return jsonify({'success': False, 'error': f'ids must be a list of 1-{MAX_BATCH_SIZE} ids'}), 400
+        
+        with database.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"DELETE FROM comments WHERE id IN ({','.join('?' * len(ids))})", ids)
+        return jsonify({'success': True, 'deleted': cursor.rowcount})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/diet-plan', methods=['GET'])
 def get_diet_plan():
     """Get diet plan data (public read access)"""
     try:
-        with database.get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT day, meal_type, food_item, quantity, calories, protein, carbs, fats
-                FROM diet_plan
-                ORDER BY day, meal_type
-            ''')
-            rows = cursor.fetchall()
-            data = []
-            for row in rows:
-                data.append({
-                    'day': row['day'],
-                    'meal_type': row['meal_type'],
-                    'food_item': row['food_item'],
-                    'quantity': row['quantity'],
-                    'calories': row['calories'],
-                    'protein': row['protein'],
-                    'carbs': row['carbs'],
-                    'fats': row['fats']
-                })
-            return jsonify({'success': True, 'data': data})
+        return plan_response('diet_plan', '''
+            SELECT day, meal_type, food_item, quantity, calories, protein, carbs, fats
+            FROM diet_plan
+            ORDER BY day, meal_type
+        ''')
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -339,38 +752,19 @@ def get_diet_plan():
 def get_exercise_plan():
     """Get exercise plan data (public read access)"""
     try:
-        with database.get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT day, exercise_name, duration_minutes, sets, reps, notes
-                FROM exercise_plan
-                ORDER BY day
-            ''')
-            rows = cursor.fetchall()
-            data = []
-            for row in rows:
-                data.append({
-                    'day': row['day'],
-                    'exercise_name': row['exercise_name'],
-                    'duration_minutes': row['duration_minutes'],
-                    'sets': row['sets'],
-                    'reps': row['reps'],
-                    'notes': row['notes']
-                })
-            return jsonify({'success': True, 'data': data})
+        return plan_response('exercise_plan', '''
+            SELECT day, exercise_name, duration_minutes, sets, reps, notes
+            FROM exercise_plan
+            ORDER BY day
+        ''')
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/ai/query', methods=['POST'])
+@require_ai_client
 def ai_query():
     """Handle AI assistant queries with specialized categories"""
     try:
-        if not client:
-            return jsonify({
-                'success': False, 
-                'error': 'OpenAI API key not configured. Please set OPENAI_API_KEY environment variable.'
-            }), 503
-        
         data = request.json
         query = data.get('query')
         category = data.get('category', 'general')  # health, food, lifestyle, fitness
@@ -378,46 +772,25 @@ def ai_query():
         if not query:
             return jsonify({'success': False, 'error': 'Query is required'}), 400
         
-        # Load health data from database
-        health_data = []
-        diet_data = []
-        exercise_data = []
+        stream = wants_stream()
         
-        with database.get_db() as conn:
-            cursor = conn.cursor()
-            
-            # Get health tracker data
-            cursor.execute('SELECT date, weight, blood_pressure, blood_sugar, sleep_hours, exercise_minutes FROM health_tracker_data ORDER BY date DESC LIMIT 30')
-            health_data = [dict(row) for row in cursor.fetchall()]
-            
-            # Get diet plan data
-            cursor.execute('SELECT day, meal_type, food_item, calories, protein, carbs FROM diet_plan LIMIT 50')
-            diet_data = [dict(row) for row in cursor.fetchall()]
-            
-            # Get exercise plan data
-            cursor.execute('SELECT day, exercise_name, duration_minutes, sets, reps FROM exercise_plan LIMIT 50')
-            exercise_data = [dict(row) for row in cursor.fetchall()]
-        
-        # Build specialized context based on category
-        system_prompts = {
-            'health': "You are a health and medical tracking assistant. Provide expert advice on health metrics, blood pressure, blood sugar, weight management, and overall health monitoring.",
-            'food': "You are a nutrition and diet planning assistant. Provide expert advice on meal planning, nutrition, calories, macronutrients (protein, carbs, fats), and healthy eating habits.",
-            'lifestyle': "You are a lifestyle and wellness assistant. Provide expert advice on sleep patterns, daily routines, work-life balance, stress management, and overall lifestyle optimization.",
-            'fitness': "You are a fitness and exercise planning assistant. Provide expert advice on workout routines, exercise techniques, training schedules, and fitness goals."
-        }
+        # Identical questions against unchanged data reuse the previous answer
+        cache_key = ai_response_cache_key(category, query)
+        with _ai_response_lock:
+            cached = _ai_response_cache.get(cache_key)
+        if cached is not None:
+            if stream:
+                events = (sse_event({'token': cached}), sse_event({'success': True, 'category': category, 'cached': True, 'done': True}))
+                return Response(events, mimetype='text/event-stream', headers=SSE_HEADERS)
+            return jsonify({'success': True, 'response': cached, 'category': category, 'cached': True})
+        
+        data_context = cached_prompt_context(AI_QUERY_CONTEXT)
         
-        system_prompt = system_prompts.get(category, system_prompts['health'])
+        system_message = AI_SYSTEM_MESSAGES.get(category) or AI_SYSTEM_MESSAGES['health']
         
         context = f"""User Query: {query}
 
-Health Tracking Data (Recent):
-{json.dumps(health_data[:10], indent=2) if health_data else 'No health data available'}
-
-Diet Plan Data:
-{json.dumps(diet_data[:20], indent=2) if diet_data else 'No diet data available'}
-
-Exercise Plan Data:
-{json.dumps(exercise_data[:20], indent=2) if exercise_data else 'No exercise data available'}
+{data_context}
 
 Please provide a detailed, helpful response based on the category: {category}"""
         
@@ -425,86 +798,48 @@ Please provide a detailed, helpful response based on the category: {category}"""
         response = client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
-                {"role": "system", "content": system_prompt},
+                system_message,
                 {"role": "user", "content": context}
             ],
             max_tokens=800,
-            temperature=0.7
+            temperature=0.7,
+            stream=stream
         )
         
+        if stream:
+            return Response(
+                stream_completion(response, {'success': True, 'category': category},
+                                  on_complete=lambda text: cache_ai_response(cache_key, text)),
+                mimetype='text/event-stream',
+                headers=SSE_HEADERS
+            )
+        
         ai_response = response.choices[0].message.content
+        cache_ai_response(cache_key, ai_response)
         
         return jsonify({'success': True, 'response': ai_response, 'category': category})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/reports/generate', methods=['POST'])
+@require_ai_client
 def generate_report():
     """Generate a health report"""
     try:
-        if not client:
-            return jsonify({
-                'success': False, 
-                'error': 'OpenAI API key not configured. Please set OPENAI_API_KEY environment variable.'
-            }), 503
-        
         data = request.json
         report_type = data.get('type', 'summary')
+        stream = wants_stream()
         
-        # Load file information and comments
-        files = []
-        if os.path.exists(CONTENT_DIR):
-            for filename in os.listdir(CONTENT_DIR):
-                filepath = os.path.join(CONTENT_DIR, filename)
-                if os.path.isfile(filepath):
-                    file_info = {
-                        'name': filename,
-                        'size': os.path.getsize(filepath),
-                        'modified': datetime.fromtimestamp(os.path.getmtime(filepath)).isoformat()
-                    }
-                    files.append(file_info)
-        
-        # Load comments from database
-        with database.get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT filename, author, comment, created_at FROM comments ORDER BY created_at DESC')
-            comment_rows = cursor.fetchall()
-        
-        comments = {}
-        for row in comment_rows:
-            filename = row['filename']
-            if filename not in comments:
-                comments[filename] = []
-            comments[filename].append({
-                'author': row['author'],
-                'comment': row['comment'],
-                'timestamp': row['created_at']
-            })
-        
-        # Load health data from database
+        # Only the file and comment counts are reported
+        files = list_content_files()
         with database.get_db() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT * FROM health_tracker_data ORDER BY date DESC LIMIT 30')
-            health_data = [dict(row) for row in cursor.fetchall()]
-            
-            cursor.execute('SELECT * FROM diet_plan LIMIT 50')
-            diet_data = [dict(row) for row in cursor.fetchall()]
-            
-            cursor.execute('SELECT * FROM exercise_plan LIMIT 50')
-            exercise_data = [dict(row) for row in cursor.fetchall()]
+            comments_count = conn.execute('SELECT COUNT(*) FROM comments').fetchone()[0]
+            data_context = cached_prompt_context(REPORT_CONTEXT, conn)
         
         # Build report context
         report_context = f"""Generate a {report_type} health tracking report based on the following data:
 
-Health Tracker Data (Recent 30 entries):
-{json.dumps(health_data, indent=2) if health_data else 'No health data available'}
-
-Diet Plan Data:
-{json.dumps(diet_data[:30], indent=2) if diet_data else 'No diet data available'}
-
-Exercise Plan Data:
-{json.dumps(exercise_data[:30], indent=2) if exercise_data else 'No exercise data available'}
+{data_context}
 
 Please generate a comprehensive health tracking report with:
 1. Health metrics analysis and trends
@@ -517,68 +852,71 @@ Please generate a comprehensive health tracking report with:
         response = client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
-                {"role": "system", "content": "You are a health tracking assistant. Generate detailed, professional health reports with insights, trends, and recommendations."},
+                REPORT_SYSTEM_MESSAGE,
                 {"role": "user", "content": report_context}
             ],
             max_tokens=1000,
-            temperature=0.7
+            temperature=0.7,
+            stream=stream
         )
         
-        report_content = response.choices[0].message.content
+        report = {
+            'type': report_type,
+            'generated_at': datetime.now(),
+            'files_count': len(files),
+            'comments_count': comments_count
+        }
         
-        return jsonify({
-            'success': True,
-            'report': {
-                'type': report_type,
-                'content': report_content,
-                'generated_at': datetime.now().isoformat(),
-                'files_count': len(files),
-                'comments_count': sum(len(c) for c in comments.values())
-            }
-        })
+        if stream:
+            return Response(
+                stream_completion(response, {'success': True, 'report': report}),
+                mimetype='text/event-stream',
+                headers=SSE_HEADERS
+            )
+        
+        report['content'] = response.choices[0].message.content
+        
+        return jsonify({'success': True, 'report': report})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Budget and Expense Management Endpoints
 
 
+EXPENSE_FIELDS = ('id', 'amount', 'description', 'category', 'date', 'month', 'is_capital', 'created_at')
+
+def expense_from_row(row):
+    """Build an expense dict from a row selected in EXPENSE_FIELDS order"""
+    # amount is a REAL column, so sqlite3 already returns floats
+    expense = dict(zip(EXPENSE_FIELDS, row))
+    expense['is_capital'] = bool(expense['is_capital'])
+    return expense
+
 @app.route('/api/expenses', methods=['GET'])
 def get_expenses():
     """Get all expenses or expenses for a specific month (public read access)"""
-    try:
-        month = request.args.get('month')
-        
+    month = request.args.get('month')
+    
+    def generate():
         with database.get_db() as conn:
             cursor = conn.cursor()
             if month:
                 cursor.execute('''
-                    SELECT id, month, date, amount, description, category, is_capital, created_at
+                    SELECT id, amount, description, category, date, month, is_capital, created_at
                     FROM expenses
                     WHERE month = ?
                     ORDER BY date DESC
                 ''', (month,))
             else:
                 cursor.execute('''
-                    SELECT id, month, date, amount, description, category, is_capital, created_at
+                    SELECT id, amount, description, category, date, month, is_capital, created_at
                     FROM expenses
                     ORDER BY date DESC
                 ''')
-            
-            rows = cursor.fetchall()
-            expenses = []
-            for row in rows:
-                expenses.append({
-                    'id': row['id'],
-                    'amount': float(row['amount']),
-                    'description': row['description'],
-                    'category': row['category'],
-                    'date': row['date'],
-                    'month': row['month'],
-                    'is_capital': bool(row['is_capital']),
-                    'created_at': row['created_at']
-                })
-        
-        return jsonify({'success': True, 'expenses': expenses})
+            yield from stream_json_array('expenses', map(expense_from_row, cursor))
+    
+    try:
+        return Response(primed(generate()), mimetype='application/json')
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -599,7 +937,7 @@ def add_expense():
         if not description or amount <= 0:
             return jsonify({'success': False, 'error': 'Description and amount are required'}), 400
         
-        expense_id = str(uuid.uuid4())
+        expense_id = secrets.token_urlsafe(16)
         
         with database.get_db() as conn:
             cursor = conn.cursor()
@@ -616,7 +954,7 @@ def add_expense():
             'date': date,
             'month': month,
             'is_capital': is_capital,
-            'created_at': datetime.now().isoformat()
+            'created_at': datetime.now()
         }
         
         return jsonify({'success': True, 'expense': expense})
@@ -635,6 +973,70 @@ def delete_expense(expense_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/expenses/batch', methods=['POST'])
+@app.route('/api/expenses/bulk', methods=['POST'])
+@require_auth
+def add_expenses_batch():
+    """Add many expenses in one transaction (requires authentication)"""
+    try:
+        items = batch_items(request.get_json(silent=True) or {}, 'expenses')
+        if items is None:
+            return jsonify({'success': False, 'error': f'items must be a list of 1-{MAX_BATCH_SIZE} objects'}), 400
+        
+        username = getattr(request, 'current_user', 'admin')
+        created_at = datetime.now()
+        today = created_at.date().isoformat()
+        current_month = get_current_month_key()
+        expenses = []
+        rows = []
+        for index, item in enumerate(items):
+            amount = float(item.get('amount', 0))
+            description = item.get('description', '')
+            if not description or amount <= 0:
+                return jsonify({'success': False, 'error': f'Item {index}: description and amount are required'}), 400
+            
+            expense = {
+                'id': secrets.token_urlsafe(16),
+                'amount': amount,
+                'description': description,
+                'category': item.get('category', 'Other'),
+                'date': item.get('date', today),
+                'month': item.get('month', current_month),
+                'is_capital': item.get('is_capital', False),
+                'created_at': created_at
+            }
+            expenses.append(expense)
+            rows.append((
+                expense['id'], expense['month'], expense['date'], amount, description,
+                expense['category'], 1 if expense['is_capital'] else 0, username
+            ))
+        
+        with database.get_db() as conn:
+            conn.executemany('''
+                INSERT INTO expenses (id, month, date, amount, description, category, is_capital, created_by)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        
+        return jsonify({'success': True, 'expenses': expenses})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/expenses/batch', methods=['DELETE'])
+@require_auth
+def delete_expenses_batch():
+    """Delete many expenses in one statement (requires authentication)"""
+    try:
+        ids = batch_ids(request.get_json(silent=True) or {})
+        if ids is None:
+            return jsonify({'success': False, 'error': f'ids must be a list of 1-{MAX_BATCH_SIZE} ids'}), 400
+        
+        with database.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"DELETE FROM expenses WHERE id IN ({','.join('?' * len(ids))})", ids)
+        return jsonify({'success': True, 'deleted': cursor.rowcount})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/budget/summary', methods=['GET'])
 def get_budget_summary():
     """Get budget summary with statistics (public read access)"""
@@ -646,31 +1048,25 @@ def get_budget_summary():
             # Get budget
             cursor.execute('SELECT total_budget FROM budgets WHERE month = ?', (month,))
             budget_row = cursor.fetchone()
-            total_budget = float(budget_row['total_budget']) if budget_row else 0
+            total_budget = budget_row['total_budget'] if budget_row else 0
             
-            # Get expenses
+            # Aggregate expenses in SQLite; month totals are summed from the O(categories) rows
             cursor.execute('''
-                SELECT amount, category, is_capital
+                SELECT category, SUM(amount) AS total, COUNT(*) AS count,
+                       SUM(CASE WHEN is_capital THEN amount ELSE 0 END) AS capital
                 FROM expenses
                 WHERE month = ?
+                GROUP BY category
             ''', (month,))
-            expense_rows = cursor.fetchall()
-            
+            expenses_by_category = {}
             total_expenses = 0
             capital_expenses = 0
-            expenses_by_category = {}
-            
-            for row in expense_rows:
-                amount = float(row['amount'])
-                total_expenses += amount
-                if row['is_capital']:
-                    capital_expenses += amount
-                
-                category = row['category']
-                if category not in expenses_by_category:
-                    expenses_by_category[category] = {'total': 0, 'count': 0}
-                expenses_by_category[category]['total'] += amount
-                expenses_by_category[category]['count'] += 1
+            expense_count = 0
+            for row in cursor:
+                expenses_by_category[row['category']] = {'total': row['total'], 'count': row['count']}
+                total_expenses += row['total']
+                capital_expenses += row['capital']
+                expense_count += row['count']
         
         regular_expenses = total_expenses - capital_expenses
         
@@ -685,13 +1081,50 @@ def get_budget_summary():
                 'remaining': total_budget - total_expenses,
                 'percentage_used': (total_expenses / total_budget * 100) if total_budget > 0 else 0,
                 'expenses_by_category': expenses_by_category,
-                'total_expense_count': len(expense_rows)
+                'total_expense_count': expense_count
             }
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Mobile App Streaming Endpoints
+# Each streamed sample is stored as one health_tracker_data row holding the metrics it carries
+@lru_cache(maxsize=None)
+def health_sample_insert_sql(columns):
+    """INSERT statement for a sample carrying the given (whitelisted) columns"""
+    return (f'INSERT INTO health_tracker_data ({", ".join(columns)}, created_at) '
+            f'VALUES ({", ".join("?" * len(columns))}, CURRENT_TIMESTAMP)')
+
+def blood_pressure_text(point):
+    """Blood pressure as 'systolic/diastolic' text, accepting either a dict or a ready string"""
+    bp = point.get('blood_pressure')
+    return f"{bp.get('systolic')}/{bp.get('diastolic')}" if isinstance(bp, dict) else bp
+
+def exercise_minutes_value(point):
+    """Exercise minutes, estimated from steps when not reported directly"""
+    return point.get('exercise_minutes') or (point.get('steps', 0) / 100)
+
+# (column, keys that mark the metric as present, value from the point), in column order;
+# heart_rate has no column yet and is not stored
+STREAM_METRICS = (
+    ('weight', ('weight',), lambda point: point.get('weight')),
+    ('blood_pressure', ('blood_pressure',), blood_pressure_text),
+    ('sleep_hours', ('sleep_hours',), lambda point: point.get('sleep_hours')),
+    ('exercise_minutes', ('steps', 'exercise_minutes'), exercise_minutes_value),
+)
+
+def health_sample_row(point, today):
+    """Map one streamed data point to the (columns, values) of a single row, or None if it has no stored metric"""
+    columns = ['date']
+    values = [point.get('timestamp', today)]
+    for column, keys, value in STREAM_METRICS:
+        if any(key in point for key in keys):
+            columns.append(column)
+            values.append(value(point))
+    if len(columns) == 1:
+        return None
+    return tuple(columns), tuple(values)
+
 @app.route('/api/stream/health-data', methods=['POST'])
 def stream_health_data():
     """Receive streaming health data from mobile app"""
@@ -706,63 +1139,19 @@ def stream_health_data():
         if not device_id or not health_data:
             return jsonify({'success': False, 'error': 'device_id and data are required'}), 400
         
-        # Map device data to database fields
-        with database.get_db() as conn:
-            cursor = conn.cursor()
-            
-            # Extract health metrics
-            if 'heart_rate' in health_data:
-                # Store heart rate (could add new table or use existing)
-                pass
-            
-            if 'weight' in health_data:
-                cursor.execute('''
-                    INSERT INTO health_tracker_data 
-                    (date, weight, created_at)
-                    VALUES (?, ?, CURRENT_TIMESTAMP)
-                ''', (
-                    health_data.get('timestamp', datetime.now().isoformat().split('T')[0]),
-                    health_data.get('weight')
-                ))
-            
-            if 'blood_pressure' in health_data:
-                bp = health_data.get('blood_pressure')
-                cursor.execute('''
-                    INSERT INTO health_tracker_data 
-                    (date, blood_pressure, created_at)
-                    VALUES (?, ?, CURRENT_TIMESTAMP)
-                ''', (
-                    health_data.get('timestamp', datetime.now().isoformat().split('T')[0]),
-                    f"{bp.get('systolic')}/{bp.get('diastolic')}" if isinstance(bp, dict) else bp
-                ))
-            
-            if 'sleep_hours' in health_data:
-                cursor.execute('''
-                    INSERT INTO health_tracker_data 
-                    (date, sleep_hours, created_at)
-                    VALUES (?, ?, CURRENT_TIMESTAMP)
-                ''', (
-                    health_data.get('timestamp', datetime.now().isoformat().split('T')[0]),
-                    health_data.get('sleep_hours')
-                ))
-            
-            if 'steps' in health_data or 'exercise_minutes' in health_data:
-                exercise_minutes = health_data.get('exercise_minutes') or (health_data.get('steps', 0) / 100)
-                cursor.execute('''
-                    INSERT INTO health_tracker_data 
-                    (date, exercise_minutes, created_at)
-                    VALUES (?, ?, CURRENT_TIMESTAMP)
-                ''', (
-                    health_data.get('timestamp', datetime.now().isoformat().split('T')[0]),
-                    exercise_minutes
-                ))
-        
+        # Map device data to a single row; samples with no stored metric skip the database
+        row = health_sample_row(health_data, get_today())
+        if row:
+            columns, values = row
+            with database.get_db() as conn:
+                conn.execute(health_sample_insert_sql(columns), values)
+            mark_data_changed()
         return jsonify({
             'success': True,
             'message': 'Data received and processed',
             'device_id': device_id,
             'connection_type': connection_type,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': datetime.now()
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -773,25 +1162,34 @@ def stream_batch_data():
     try:
         data = request.json
         device_id = data.get('device_id')
-        device_type = data.get('device_type')
-        connection_type = data.get('connection_type')
         data_points = data.get('data_points', [])
         
         if not device_id or not data_points:
             return jsonify({'success': False, 'error': 'device_id and data_points are required'}), 400
         
+        # Map every point to one row first, then insert each column layout with one executemany
+        today = get_today()
+        rows_by_columns = {}
         processed = 0
         errors = []
-        
         for point in data_points:
             try:
-                # Process each data point
-                with database.get_db() as conn:
-                    cursor = conn.cursor()
-                    # Similar processing as single stream endpoint
-                    processed += 1
+                row = health_sample_row(point, today)
             except Exception as e:
                 errors.append({'point': point, 'error': str(e)})
+                continue
+            if row:
+                columns, values = row
+                rows_by_columns.setdefault(columns, []).append(values)
+            processed += 1
+        
+        # Batches of heart-rate-only or invalid points have nothing to store: skip the write transaction
+        if rows_by_columns:
+            with database.get_db() as conn:
+                cursor = conn.cursor()
+                for columns, rows in rows_by_columns.items():
+                    cursor.executemany(health_sample_insert_sql(columns), rows)
+            mark_data_changed()
         
         return jsonify({
             'success': True,
@@ -816,49 +1214,41 @@ def get_connected_devices():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Continuous Glucose Monitoring (CGM) Endpoints
+def cgm_data_query(has_device, has_start, has_end):
+    """Build the CGM listing query for one combination of optional filters"""
+    conditions = [condition for present, condition in (
+        (has_device, 'device_id = ?'),
+        (has_start, 'timestamp >= ?'),
+        (has_end, 'timestamp <= ?'),
+    ) if present]
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return f'''
+        SELECT id, device_id, glucose_value, trend, timestamp, meal_context, insulin_on_board, alerts
+        FROM cgm_data {where}
+        ORDER BY timestamp DESC LIMIT 1000
+    '''
+
+# Every filter combination built once, so each request reuses an identical string from the statement cache
+CGM_DATA_QUERIES = {mask: cgm_data_query(*mask) for mask in product((False, True), repeat=3)}
+
 @app.route('/api/cgm/data', methods=['GET'])
 def get_cgm_data():
     """Get CGM data (read-only)"""
-    try:
-        device_id = request.args.get('device_id')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        
+    device_id = request.args.get('device_id')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    def generate():
         with database.get_db() as conn:
             cursor = conn.cursor()
             
-            query = 'SELECT * FROM cgm_data WHERE 1=1'
-            params = []
-            
-            if device_id:
-                query += ' AND device_id = ?'
-                params.append(device_id)
-            if start_date:
-                query += ' AND timestamp >= ?'
-                params.append(start_date)
-            if end_date:
-                query += ' AND timestamp <= ?'
-                params.append(end_date)
-            
-            query += ' ORDER BY timestamp DESC LIMIT 1000'
-            
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            data = []
-            for row in rows:
-                data.append({
-                    'id': row['id'],
-                    'device_id': row['device_id'],
-                    'glucose_value': row['glucose_value'],
-                    'trend': row['trend'],
-                    'timestamp': row['timestamp'],
-                    'meal_context': row['meal_context'],
-                    'insulin_on_board': row['insulin_on_board'],
-                    'alerts': row['alerts']
-                })
-            
-            return jsonify({'success': True, 'data': data})
+            filters = (device_id, start_date, end_date)
+            query = CGM_DATA_QUERIES[tuple(bool(value) for value in filters)]
+            cursor.execute(query, [value for value in filters if value])
+            yield from stream_json_array('data', iter_row_dicts(cursor))
+    
+    try:
+        return Response(primed(generate()), mimetype='application/json')
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -875,26 +1265,15 @@ def stream_cgm_data():
         if not device_id or not cgm_data:
             return jsonify({'success': False, 'error': 'device_id and data are required'}), 400
         
-        # Ensure CGM table exists
+        glucose_value = cgm_data.get('glucose_value')
+        timestamp = cgm_data.get('timestamp') or datetime.now().isoformat()
+        alerts = cgm_data.get('alerts')
+        
+        # cgm_data is created with the rest of the schema in database.init_database();
+        # both inserts share the pooled connection's single transaction
         with database.get_db() as conn:
             cursor = conn.cursor()
             
-            # Create CGM table if not exists
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS cgm_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    device_id TEXT NOT NULL,
-                    device_type TEXT,
-                    glucose_value REAL NOT NULL,
-                    trend TEXT,
-                    timestamp TIMESTAMP NOT NULL,
-                    meal_context TEXT,
-                    insulin_on_board REAL,
-                    alerts TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
             # Insert CGM reading
             cursor.execute('''
                 INSERT INTO cgm_data 
@@ -903,35 +1282,50 @@ def stream_cgm_data():
             ''', (
                 device_id,
                 device_type,
-                cgm_data.get('glucose_value'),
+                glucose_value,
                 cgm_data.get('trend'),  # rising, falling, stable, etc.
-                cgm_data.get('timestamp', datetime.now().isoformat()),
+                timestamp,
                 cgm_data.get('meal_context'),  # before_meal, after_meal, fasting
                 cgm_data.get('insulin_on_board'),
-                json.dumps(cgm_data.get('alerts', [])) if cgm_data.get('alerts') else None
+                json_bytes(alerts).decode() if alerts else None  # TEXT, so JSON1 functions can read it
             ))
             
             # Also update health_tracker_data if needed
-            if cgm_data.get('glucose_value'):
+            if glucose_value:
                 cursor.execute('''
                     INSERT OR REPLACE INTO health_tracker_data 
                     (date, blood_sugar, created_at)
-                    VALUES (?, ?, CURRENT_TIMESTAMP)
-                ''', (
-                    cgm_data.get('timestamp', datetime.now().isoformat()).split('T')[0],
-                    str(cgm_data.get('glucose_value'))
-                ))
+                    VALUES (substr(?, 1, 10), ?, CURRENT_TIMESTAMP)
+                ''', (timestamp, str(glucose_value)))
+        if glucose_value:
+            mark_data_changed()
         
         return jsonify({
             'success': True,
             'message': 'CGM data received',
             'device_id': device_id,
-            'glucose_value': cgm_data.get('glucose_value'),
-            'timestamp': datetime.now().isoformat()
+            'glucose_value': glucose_value,
+            'timestamp': timestamp
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Separate statements with and without the device filter, so each plans onto its partial alerts index.
+# SQLite renders the whole alerts array (stored alert text re-emitted as JSON by json()), newest first
+CGM_ALERTS_JSON_SQL = '''
+    SELECT json_group_array(json_object(
+        'device_id', device_id, 'glucose_value', glucose_value, 'alerts', json(alerts), 'timestamp', timestamp
+    ))
+    FROM (
+        SELECT device_id, glucose_value, alerts, timestamp FROM cgm_data
+        WHERE alerts IS NOT NULL {device_filter}
+        ORDER BY timestamp DESC
+        LIMIT 50
+    )
+'''
+CGM_ALERTS_SQL = CGM_ALERTS_JSON_SQL.format(device_filter='')
+CGM_DEVICE_ALERTS_SQL = CGM_ALERTS_JSON_SQL.format(device_filter='AND device_id = ?')
+
 @app.route('/api/cgm/alerts', methods=['GET'])
 def get_cgm_alerts():
     """Get CGM alerts (high/low glucose)"""
@@ -940,30 +1334,31 @@ def get_cgm_alerts():
         
         with database.get_db() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM cgm_data
-                WHERE alerts IS NOT NULL
-                AND (device_id = ? OR ? IS NULL)
-                ORDER BY timestamp DESC
-                LIMIT 50
-            ''', (device_id, device_id))
+            if device_id:
+                cursor.execute(CGM_DEVICE_ALERTS_SQL, (device_id,))
+            else:
+                cursor.execute(CGM_ALERTS_SQL)
             
-            rows = cursor.fetchall()
-            alerts = []
-            for row in rows:
-                if row['alerts']:
-                    alert_data = json.loads(row['alerts']) if isinstance(row['alerts'], str) else row['alerts']
-                    alerts.append({
-                        'device_id': row['device_id'],
-                        'glucose_value': row['glucose_value'],
-                        'alerts': alert_data,
-                        'timestamp': row['timestamp']
-                    })
+            alerts = cursor.fetchone()[0]
             
-            return jsonify({'success': True, 'alerts': alerts})
+            return Response(f'{{"success":true,"alerts":{alerts}}}', mimetype='application/json')
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Summed from the hourly rollups, so the window starts at the top of its first hour;
+# the device variant range-scans the (device_id, hour_bucket) primary key
+CGM_STATS_SQL = '''
+    SELECT 
+        SUM(sum_glucose) / SUM(reading_count) as avg_glucose,
+        MIN(min_glucose) as min_glucose,
+        MAX(max_glucose) as max_glucose,
+        SUM(reading_count) as total_readings,
+        SUM(in_range_count) as in_range_count
+    FROM cgm_rollup_hourly
+    WHERE hour_bucket >= ?
+'''
+CGM_DEVICE_STATS_SQL = CGM_STATS_SQL + ' AND device_id = ?'
+
 @app.route('/api/cgm/stats', methods=['GET'])
 def get_cgm_stats():
     """Get CGM statistics (time in range, average, etc.)"""
@@ -974,18 +1369,12 @@ def get_cgm_stats():
         with database.get_db() as conn:
             cursor = conn.cursor()
             
-            start_date = (datetime.now() - timedelta(days=days)).isoformat()
+            window_start = cgm_window_start(int(time.time()) // 60, days)
             
-            cursor.execute('''
-                SELECT 
-                    AVG(glucose_value) as avg_glucose,
-                    MIN(glucose_value) as min_glucose,
-                    MAX(glucose_value) as max_glucose,
-                    COUNT(*) as total_readings,
-                    SUM(CASE WHEN glucose_value >= 70 AND glucose_value <= 180 THEN 1 ELSE 0 END) as in_range_count
-                FROM cgm_data
-                WHERE timestamp >= ? AND (device_id = ? OR ? IS NULL)
-            ''', (start_date, device_id, device_id))
+            if device_id:
+                cursor.execute(CGM_DEVICE_STATS_SQL, (window_start, device_id))
+            else:
+                cursor.execute(CGM_STATS_SQL, (window_start,))
             
             row = cursor.fetchone()
             
@@ -1001,10 +1390,21 @@ def get_cgm_stats():
                 'days': days
             }
             
-            return jsonify({'success': True, 'stats': stats})
+            # The stats drift slowly, so let clients reuse them briefly and revalidate by body hash after that
+            response = jsonify({'success': True, 'stats': stats})
+            response.cache_control.public = True
+            response.cache_control.max_age = CGM_STATS_MAX_AGE
+            response.add_etag()
+            return response.make_conditional(request)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Fields returned for each health plan week, in response order
+HEALTH_PLAN_COLUMNS = '''
+    id, week_number, week_start_date, medication_dose, medication_timing, target_biomarkers, diet_focus,
+    exercise_plan, sleep_target_hours, stress_management, key_milestones, progress_notes, status
+'''
+
 @app.route('/api/health-plan', methods=['GET'])
 def get_health_plan():
     """Get the complete health plan"""
@@ -1012,38 +1412,18 @@ def get_health_plan():
         week = request.args.get('week', type=int)
         
         with database.get_db() as conn:
-            cursor = conn.cursor()
-            
+            # Weeks only change through update_health_plan_week, which stamps updated_at to the millisecond;
+            # both values come from the database, so every worker agrees on the ETag
+            count, last_update = conn.execute('SELECT COUNT(*), MAX(updated_at) FROM health_goals').fetchone()
+            fingerprint = f'health_goals:{count}:{last_update}:{week or "all"}'
             if week:
-                cursor.execute('''
-                    SELECT * FROM health_goals WHERE week_number = ?
+                return fingerprinted_response(conn, fingerprint, f'''
+                    SELECT {HEALTH_PLAN_COLUMNS} FROM health_goals WHERE week_number = ?
                     ORDER BY week_number
-                ''', (week,))
-            else:
-                cursor.execute('''
-                    SELECT * FROM health_goals ORDER BY week_number
-                ''')
-            
-            rows = cursor.fetchall()
-            plan = []
-            for row in rows:
-                plan.append({
-                    'id': row['id'],
-                    'week_number': row['week_number'],
-                    'week_start_date': row['week_start_date'],
-                    'medication_dose': row['medication_dose'],
-                    'medication_timing': row['medication_timing'],
-                    'target_biomarkers': row['target_biomarkers'],
-                    'diet_focus': row['diet_focus'],
-                    'exercise_plan': row['exercise_plan'],
-                    'sleep_target_hours': row['sleep_target_hours'],
-                    'stress_management': row['stress_management'],
-                    'key_milestones': row['key_milestones'],
-                    'progress_notes': row['progress_notes'],
-                    'status': row['status']
-                })
-            
-            return jsonify({'success': True, 'plan': plan})
+                ''', (week,), key='plan')
+            return fingerprinted_response(conn, fingerprint, f'''
+                SELECT {HEALTH_PLAN_COLUMNS} FROM health_goals ORDER BY week_number
+            ''', key='plan')
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1060,7 +1440,7 @@ def update_health_plan_week(week_id):
             cursor = conn.cursor()
             cursor.execute('''
                 UPDATE health_goals 
-                SET progress_notes = ?, status = ?, updated_at = datetime('now')
+                SET progress_notes = ?, status = ?, updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
                 WHERE id = ?
             ''', (progress_notes, status, week_id))
             
@@ -1068,66 +1448,38 @@ def update_health_plan_week(week_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# The latest week that has started, falling back to the first week before the plan begins
+CURRENT_WEEK_SQL = f'''
+    SELECT {HEALTH_PLAN_COLUMNS} FROM (
+        SELECT * FROM (
+            SELECT *, 0 AS fallback FROM health_goals
+            WHERE week_start_date <= ?
+            ORDER BY week_number DESC
+            LIMIT 1
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT *, 1 AS fallback FROM health_goals
+            ORDER BY week_number
+            LIMIT 1
+        )
+    )
+    ORDER BY fallback
+    LIMIT 1
+'''
+
 @app.route('/api/health-plan/current', methods=['GET'])
 def get_current_week():
     """Get the current week of the health plan"""
     try:
-        today = datetime.now().date()
-        
         with database.get_db() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM health_goals 
-                WHERE week_start_date <= ?
-                ORDER BY week_number DESC
-                LIMIT 1
-            ''', (today.isoformat(),))
-            
-            row = cursor.fetchone()
-            if row:
-                return jsonify({
-                    'success': True,
-                    'current_week': {
-                        'id': row['id'],
-                        'week_number': row['week_number'],
-                        'week_start_date': row['week_start_date'],
-                        'medication_dose': row['medication_dose'],
-                        'medication_timing': row['medication_timing'],
-                        'target_biomarkers': row['target_biomarkers'],
-                        'diet_focus': row['diet_focus'],
-                        'exercise_plan': row['exercise_plan'],
-                        'sleep_target_hours': row['sleep_target_hours'],
-                        'stress_management': row['stress_management'],
-                        'key_milestones': row['key_milestones'],
-                        'progress_notes': row['progress_notes'],
-                        'status': row['status']
-                    }
-                })
-            else:
-                # Return first week if no current week found
-                cursor.execute('SELECT * FROM health_goals ORDER BY week_number LIMIT 1')
-                row = cursor.fetchone()
-                if row:
-                    return jsonify({
-                        'success': True,
-                        'current_week': {
-                            'id': row['id'],
-                            'week_number': row['week_number'],
-                            'week_start_date': row['week_start_date'],
-                            'medication_dose': row['medication_dose'],
-                            'medication_timing': row['medication_timing'],
-                            'target_biomarkers': row['target_biomarkers'],
-                            'diet_focus': row['diet_focus'],
-                            'exercise_plan': row['exercise_plan'],
-                            'sleep_target_hours': row['sleep_target_hours'],
-                            'stress_management': row['stress_management'],
-                            'key_milestones': row['key_milestones'],
-                            'progress_notes': row['progress_notes'],
-                            'status': row['status']
-                        }
-                    })
-                else:
-                    return jsonify({'success': False, 'error': 'No health plan found'}), 404
+            cursor.execute(CURRENT_WEEK_SQL, (get_today(),))
+            weeks = rows_as_dicts(cursor)
+        
+        if not weeks:
+            return jsonify({'success': False, 'error': 'No health plan found'}), 404
+        return jsonify({'success': True, 'current_week': weeks[0]})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1197,7 +1549,7 @@ def apple_callback():
         if not code or not state:
             return jsonify({'success': False, 'error': 'Missing code or state'}), 400
         
-        integration = device_integrations.AppleHealthKitIntegration()
+        integration = device_integrations.INTEGRATIONS['apple_watch']
         token_data = integration.exchange_code_for_token(code)
         
         if 'error' in token_data:
@@ -1241,7 +1593,7 @@ def garmin_callback():
         if not oauth_token or not oauth_verifier:
             return jsonify({'success': False, 'error': 'Missing OAuth parameters'}), 400
         
-        integration = device_integrations.GarminConnectIntegration()
+        integration = device_integrations.INTEGRATIONS['garmin']
         token_data = integration.exchange_token(oauth_token, oauth_verifier)
         
         if 'error' in token_data:
@@ -1261,7 +1613,7 @@ def garmin_callback():
                 token_data.get('access_token'),
                 token_data.get('access_token_secret'),
                 1,
-                json.dumps({'oauth_token': oauth_token}),
+                json_bytes({'oauth_token': oauth_token}).decode(),
                 username
             ))
             device_id = cursor.lastrowid
@@ -1284,7 +1636,7 @@ def fitbit_callback():
         if not code:
             return jsonify({'success': False, 'error': 'Missing authorization code'}), 400
         
-        integration = device_integrations.FitbitIntegration()
+        integration = device_integrations.INTEGRATIONS['fitbit']
         token_data = integration.exchange_code_for_token(code)
         
         if 'error' in token_data:
@@ -1328,7 +1680,7 @@ def withings_callback():
         if not code:
             return jsonify({'success': False, 'error': 'Missing authorization code'}), 400
         
-        integration = device_integrations.WithingsIntegration()
+        integration = device_integrations.INTEGRATIONS['withings']
         token_data = integration.exchange_code_for_token(code)
         
         if 'error' in token_data:
@@ -1350,7 +1702,7 @@ def withings_callback():
                 token_data.get('refresh_token'),
                 datetime.now() + timedelta(seconds=token_data.get('expires_in', 10800)),
                 1,
-                json.dumps({'userid': token_data.get('userid')}),
+                json_bytes({'userid': token_data.get('userid')}).decode(),
                 username
             ))
             device_id = cursor.lastrowid
@@ -1363,10 +1715,31 @@ def withings_callback():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Vendor syncs take seconds of network I/O, so they run off the request; progress lives in device_connections
+SYNC_WORKERS = 4
+sync_executor = ThreadPoolExecutor(max_workers=SYNC_WORKERS, thread_name_prefix='device-sync')
+
+def run_device_sync(device_id, sync):
+    """Run one device sync and record its failure on the device (success is recorded by the sync itself)"""
+    try:
+        result = sync()
+    except Exception as e:
+        result = {'success': False, 'error': str(e)}
+    if result.get('success'):
+        # Runs on this worker's executor, so this invalidates the same AI caches that serve its requests
+        mark_data_changed()
+    else:
+        with database.get_db() as conn:
+            conn.execute('''
+                UPDATE device_connections 
+                SET sync_status = 'error', sync_error = ?
+                WHERE id = ?
+            ''', (result.get('error', 'Unknown error'), device_id))
+
 @app.route('/api/devices/<int:device_id>/sync', methods=['POST'])
 @require_auth
 def sync_device(device_id):
-    """Manually trigger device sync"""
+    """Start a device sync in the background; poll /sync/status for the outcome"""
     try:
         days = request.json.get('days', 7) if request.json else 7
         
@@ -1381,6 +1754,22 @@ def sync_device(device_id):
             if not device['sync_enabled']:
                 return jsonify({'success': False, 'error': 'Sync is disabled for this device'}), 400
             
+            # Pick the sync before marking the device, so an unsupported type is never left 'syncing'
+            if device['device_type'] == 'apple_watch':
+                integration = device_integrations.INTEGRATIONS['apple_watch']
+                sync = partial(integration.sync_to_database, device_id, device['access_token'], days)
+            elif device['device_type'] == 'garmin':
+                integration = device_integrations.INTEGRATIONS['garmin']
+                sync = partial(
+                    integration.sync_to_database,
+                    device_id, 
+                    device['access_token'], 
+                    device['refresh_token'],
+                    days
+                )
+            else:
+                return jsonify({'success': False, 'error': 'Unsupported device type'}), 400
+            
             # Update sync status
             cursor.execute('''
                 UPDATE device_connections 
@@ -1388,39 +1777,32 @@ def sync_device(device_id):
                 WHERE id = ?
             ''', (device_id,))
         
-        # Perform sync based on device type
-        if device['device_type'] == 'apple_watch':
-            integration = device_integrations.AppleHealthKitIntegration()
-            result = integration.sync_to_database(device_id, device['access_token'], days)
-        elif device['device_type'] == 'garmin':
-            metadata = json.loads(device['metadata']) if device['metadata'] else {}
-            integration = device_integrations.GarminConnectIntegration()
-            result = integration.sync_to_database(
-                device_id, 
-                device['access_token'], 
-                device['refresh_token'],
-                days
-            )
-        else:
-            return jsonify({'success': False, 'error': 'Unsupported device type'}), 400
+        sync_executor.submit(run_device_sync, device_id, sync)
+        return jsonify({'success': True, 'device_id': device_id, 'status': 'syncing'}), 202
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/devices/<int:device_id>/sync/status', methods=['GET'])
+def get_device_sync_status(device_id):
+    """Report the state of a device's latest sync (public read access)"""
+    try:
+        with database.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT sync_status, sync_error, last_sync_at FROM device_connections WHERE id = ?
+            ''', (device_id,))
+            row = cursor.fetchone()
         
-        if result.get('success'):
-            return jsonify({
-                'success': True,
-                'message': 'Sync completed successfully',
-                'records_synced': result.get('records_synced', 0)
-            })
-        else:
-            # Update error status
-            with database.get_db() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE device_connections 
-                    SET sync_status = 'error', sync_error = ?
-                    WHERE id = ?
-                ''', (result.get('error', 'Unknown error'), device_id))
-            
-            return jsonify({'success': False, 'error': result.get('error', 'Sync failed')}), 500
+        if not row:
+            return jsonify({'success': False, 'error': 'Device not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'device_id': device_id,
+            'status': row['sync_status'],
+            'error': row['sync_error'],
+            'last_sync_at': row['last_sync_at']
+        })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1466,6 +1848,24 @@ def toggle_device_sync(device_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Parse off the import path so the worker serves immediately
+content_parse_thread = None
+if not STARTUP_DATA_READY:
+    content_parse_thread = threading.Thread(target=parse_content_files, daemon=True)
+    content_parse_thread.start()
+
+@app.cli.command('init-data')
+def init_data_command():
+    """Create tables, parse Content/ and create the health plan, then exit"""
+    if content_parse_thread:
+        # Importing the app already initialized the database; wait for its parse to finish
+        content_parse_thread.join()
+        return
+    database.init_database()
+    parse_content_files()
+    init_health_plan()
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # The reloader and debugger are for local development only; production runs gunicorn wsgi:app
+    app.run(debug=os.environ.get('FLASK_ENV') == 'development', host='0.0.0.0', port=5000)
 
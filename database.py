@@ -1,16 +1,119 @@
 import sqlite3
 import hashlib
+import hmac
 import os
-from datetime import datetime
+import queue
+import secrets
+import threading
+import time
 from contextlib import contextmanager
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError, VerifyMismatchError
 
 DATABASE = 'health_tracker.db'
+# Recorded in the meta table; bump it whenever create_schema() changes so existing databases upgrade
+SCHEMA_VERSION = 5
+# Connections per worker process. Under gevent, requests share a worker's connections, and
+# streamed responses (comments, expenses) hold one until the client has read the body.
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 16))
+READ_POOL_SIZE = int(os.environ.get('DB_READ_POOL_SIZE', 4))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
 
-def init_database():
-    """Initialize the database with all required tables"""
-    conn = sqlite3.connect(DATABASE)
+SESSION_LIFETIME = 24 * 60 * 60  # seconds; sessions.expires_at is a unix epoch
+# Expired sessions are purged off the request path; WAL checkpoints are left to SQLite's autocheckpoint
+SESSION_CLEANUP_INTERVAL = 300  # seconds
+
+# Argon2id with the RFC 9106 low-memory profile (t=2, m=19 MiB, p=1)
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+# Per-connection tuning. WAL is persistent in the file and is set once at init.
+CONNECTION_PRAGMAS = '''
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-65536;
+    PRAGMA busy_timeout=5000;
+    PRAGMA cache_spill=OFF;
+'''
+
+def connect(**kwargs):
+    """Open a database connection with the tuned PRAGMAs applied"""
+    conn = sqlite3.connect(DATABASE, **kwargs)
+    conn.executescript(CONNECTION_PRAGMAS)
+    return conn
+
+class SqlitePool:
+    """Bounded pool of long-lived connections, opened lazily and reused across requests"""
+    
+    def __init__(self, size, read_only=False):
+        self.size = size
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._reset()
+    
+    def _reset(self):
+        self._pid = os.getpid()
+        # LIFO hands out the most recently used connection, whose page cache is warmest
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._created = 0
+    
+    def acquire(self):
+        # Connections must not cross a fork; a child process starts a fresh pool
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    _inherited_connections.append(self._idle)
+                    self._reset()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            # Room for every distinct statement the app issues, so each is prepared once per connection
+            conn = connect(check_same_thread=False, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            if self.read_only:
+                conn.execute('PRAGMA query_only=ON')
+            return conn
+        try:
+            return self._idle.get(timeout=POOL_TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError('Database busy: no pooled connection became free in time') from None
+    
+    def release(self, conn):
+        self._idle.put(conn)
+
+# Parent-process connections are kept referenced (never closed) after a fork
+_inherited_connections = []
+
+def schema_version(conn):
+    """Return the schema version recorded in the meta table, or None if there is none yet"""
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+    except sqlite3.OperationalError:
+        return None  # meta table predates versioning
+    return int(row[0]) if row else None
+
+def create_schema(conn):
+    """Create or upgrade all tables, indexes and triggers in one transaction"""
+    # journal_mode cannot change inside a transaction; WAL then persists in the file
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('BEGIN')
     cursor = conn.cursor()
     
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    
     # Users table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -98,6 +201,48 @@ def init_database():
         )
     ''')
     
+    # Hourly CGM rollups (hour_bucket is the 'YYYY-MM-DDTHH' timestamp prefix) so stats never scan raw readings
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cgm_rollup_hourly (
+            device_id TEXT NOT NULL,
+            hour_bucket TEXT NOT NULL,
+            sum_glucose REAL NOT NULL,
+            min_glucose REAL NOT NULL,
+            max_glucose REAL NOT NULL,
+            reading_count INTEGER NOT NULL,
+            in_range_count INTEGER NOT NULL,
+            PRIMARY KEY (device_id, hour_bucket)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Backfill readings stored before the rollup table existed; afterwards the trigger keeps it current
+    cursor.execute('SELECT EXISTS (SELECT 1 FROM cgm_rollup_hourly)')
+    if not cursor.fetchone()[0]:
+        cursor.execute('''
+            INSERT INTO cgm_rollup_hourly
+            (device_id, hour_bucket, sum_glucose, min_glucose, max_glucose, reading_count, in_range_count)
+            SELECT device_id, substr(timestamp, 1, 13), SUM(glucose_value), MIN(glucose_value), MAX(glucose_value),
+                   COUNT(*), SUM(glucose_value BETWEEN 70 AND 180)
+            FROM cgm_data
+            GROUP BY device_id, substr(timestamp, 1, 13)
+        ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS cgm_rollup_after_insert AFTER INSERT ON cgm_data
+        BEGIN
+            INSERT INTO cgm_rollup_hourly
+            (device_id, hour_bucket, sum_glucose, min_glucose, max_glucose, reading_count, in_range_count)
+            VALUES (NEW.device_id, substr(NEW.timestamp, 1, 13), NEW.glucose_value, NEW.glucose_value,
+                    NEW.glucose_value, 1, NEW.glucose_value BETWEEN 70 AND 180)
+            ON CONFLICT (device_id, hour_bucket) DO UPDATE SET
+                sum_glucose = sum_glucose + excluded.sum_glucose,
+                min_glucose = MIN(min_glucose, excluded.min_glucose),
+                max_glucose = MAX(max_glucose, excluded.max_glucose),
+                reading_count = reading_count + 1,
+                in_range_count = in_range_count + excluded.in_range_count;
+        END
+    ''')
+    
     # Health Goals and Week-by-Week Plan table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS health_goals (
@@ -201,51 +346,90 @@ def init_database():
             session_id TEXT PRIMARY KEY,
             username TEXT NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            expires_at TIMESTAMP NOT NULL
+            expires_at INTEGER NOT NULL
         )
     ''')
     
-    # Create default admin user if not exists
-    default_password = 'admin123'
-    password_hash = hashlib.sha256(default_password.encode()).hexdigest()
+    # Indexes for hot query paths
+    # Covers the budget summary's GROUP BY category (amount, is_capital read from the index);
+    # it supersedes the earlier (month, category) index
+    cursor.execute('DROP INDEX IF EXISTS idx_expenses_month_category')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_expenses_month_summary ON expenses(month, category, is_capital, amount)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_expenses_month_date ON expenses(month, date DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_diet_plan_day_meal ON diet_plan(day, meal_type)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_exercise_plan_day ON exercise_plan(day)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comments_created ON comments(created_at DESC)')
+    # Comment listing only needs idx_comments_created; the per-file index is no longer read
+    cursor.execute('DROP INDEX IF EXISTS idx_comments_file_created')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_health_date ON health_tracker_data(date DESC)')
+    # CGM reads filter by device and range-scan timestamp; glucose_value makes the stats aggregate index-only.
+    # It supersedes the earlier (device_id, timestamp) index
+    cursor.execute('DROP INDEX IF EXISTS idx_cgm_device_ts')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cgm_device_ts_glucose ON cgm_data(device_id, timestamp DESC, glucose_value)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cgm_ts ON cgm_data(timestamp DESC)')
+    # Partial indexes over alert rows only, with and without a device filter
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cgm_alerts ON cgm_data(device_id, timestamp DESC) WHERE alerts IS NOT NULL')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cgm_alerts_ts ON cgm_data(timestamp DESC) WHERE alerts IS NOT NULL')
+    # All-device stats range over hour_bucket; per-device stats use the primary key
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cgm_rollup_hour ON cgm_rollup_hourly(hour_bucket)')
+    # Lets the periodic expired-session purge range-scan instead of reading every session
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)')
+    # budgets.month, users.username (UNIQUE) and sessions.session_id (PRIMARY KEY) are already
+    # indexed; a username match is at most one row, so the optional email check needs no index
     
-    try:
-        cursor.execute('''
-            INSERT INTO users (username, email, password_hash)
-            VALUES (?, ?, ?)
-        ''', ('admin', 'admin@healthtracker.com', password_hash))
-        conn.commit()
-        print(f"Default admin user created. Username: admin, Password: {default_password}")
-    except sqlite3.IntegrityError:
-        pass  # User already exists
+    # Databases created before users.email existed
+    cursor.execute("PRAGMA table_info(users)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if 'email' not in columns:
+        cursor.execute('ALTER TABLE users ADD COLUMN email TEXT')
+    # Sessions written before expires_at became a unix epoch may hold host-local time, so their
+    # true expiry is unknown; drop them and let those users log in again
+    cursor.execute("DELETE FROM sessions WHERE typeof(expires_at) = 'text'")
     
-    # Create vikramsankhala user
-    vikram_password = 'vikramsankhala'
-    vikram_password_hash = hashlib.sha256(vikram_password.encode()).hexdigest()
+    cursor.execute('ANALYZE')
+    cursor.execute('''
+        INSERT INTO meta (key, value) VALUES ('schema_version', ?)
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value
+    ''', (str(SCHEMA_VERSION),))
+    conn.commit()
+
+def init_database():
+    """Initialize the database, skipping the schema work when it is already current"""
+    conn = connect()
+    if schema_version(conn) != SCHEMA_VERSION:
+        create_schema(conn)
+    cursor = conn.cursor()
     
-    try:
-        cursor.execute('''
-            INSERT INTO users (username, email, password_hash)
-            VALUES (?, ?, ?)
-        ''', ('vikramsankhala', 'vikramsankhala@healthtracker.com', vikram_password_hash))
-        conn.commit()
-        print(f"User vikramsankhala created. Password: {vikram_password}")
-    except sqlite3.IntegrityError:
-        # Update password if user exists
-        cursor.execute('''
-            UPDATE users SET password_hash = ? WHERE username = ?
-        ''', (vikram_password_hash, 'vikramsankhala'))
-        conn.commit()
-        print(f"User vikramsankhala password updated.")
+    # Default users, written in one transaction. admin keeps any password changed since;
+    # vikramsankhala is reset to its default on every start
+    default_password = 'admin123'
+    vikram_password = 'vikramsankhala'
+    cursor.execute('''
+        INSERT INTO users (username, email, password_hash)
+        VALUES (?, ?, ?)
+        ON CONFLICT (username) DO NOTHING
+    ''', ('admin', 'admin@healthtracker.com', hash_password(default_password)))
+    if cursor.rowcount:
+        print(f"Default admin user created. Username: admin, Password: {default_password}")
+    cursor.execute('''
+        INSERT INTO users (username, email, password_hash)
+        VALUES (?, ?, ?)
+        ON CONFLICT (username) DO UPDATE SET password_hash = excluded.password_hash, email = excluded.email
+    ''', ('vikramsankhala', 'vikramsankhala@healthtracker.com', hash_password(vikram_password)))
     
     conn.commit()
     conn.close()
 
+_pool = SqlitePool(POOL_SIZE)
+# Auth lookups run on every authenticated request; give them their own read-only connections
+# so they never queue behind writers or streamed responses holding the main pool
+_read_pool = SqlitePool(READ_POOL_SIZE, read_only=True)
+
 @contextmanager
 def get_db():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
+    """Context manager for pooled database connections"""
+    conn = _pool.acquire()
     try:
         yield conn
         conn.commit()
@@ -253,15 +437,34 @@ def get_db():
         conn.rollback()
         raise
     finally:
-        conn.close()
+        _pool.release(conn)
+
+@contextmanager
+def get_read_db():
+    """Context manager for pooled read-only connections"""
+    conn = _read_pool.acquire()
+    try:
+        yield conn
+    finally:
+        _read_pool.release(conn)
 
 def hash_password(password):
-    """Hash a password using SHA256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash a password with Argon2id"""
+    return _password_hasher.hash(password)
 
 def verify_password(password, password_hash):
-    """Verify a password against its hash"""
-    return hash_password(password) == password_hash
+    """Verify a password against its hash (Argon2id, or a legacy unsalted SHA-256 digest)"""
+    if not password_hash.startswith('$argon2'):
+        legacy_hash = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy_hash, password_hash)
+    try:
+        return _password_hasher.verify(password_hash, password)
+    except (VerifyMismatchError, VerificationError, InvalidHashError):
+        return False
+
+def password_needs_rehash(password_hash):
+    """Whether a stored hash predates Argon2id or the current cost parameters"""
+    return not password_hash.startswith('$argon2') or _password_hasher.check_needs_rehash(password_hash)
 
 def create_user(username, password):
     """Create a new user"""
@@ -277,195 +480,91 @@ def create_user(username, password):
         except sqlite3.IntegrityError:
             return False
 
+# Auth and session statements, shared so each is prepared once per pooled connection
+AUTH_USER_SQL = 'SELECT password_hash FROM users WHERE username = ?'
+AUTH_USER_EMAIL_SQL = 'SELECT password_hash FROM users WHERE username = ? AND email = ?'
+UPDATE_PASSWORD_SQL = 'UPDATE users SET password_hash = ? WHERE username = ?'
+INSERT_SESSION_SQL = 'INSERT INTO sessions (session_id, username, expires_at) VALUES (?, ?, ?)'
+VERIFY_SESSION_SQL = 'SELECT username, expires_at FROM sessions WHERE session_id = ? AND expires_at > ?'
+DELETE_SESSION_SQL = 'DELETE FROM sessions WHERE session_id = ?'
+PURGE_SESSIONS_SQL = 'DELETE FROM sessions WHERE expires_at < ?'
+
+def session_timestamp():
+    """Current time as a unix epoch, the form sessions.expires_at is stored in"""
+    return int(time.time())
+
 def authenticate_user(username, password, email=None):
     """Authenticate a user"""
-    with get_db() as conn:
+    with get_read_db() as conn:
         cursor = conn.cursor()
         if email:
-            cursor.execute('SELECT password_hash FROM users WHERE username = ? AND email = ?', (username, email))
+            cursor.execute(AUTH_USER_EMAIL_SQL, (username, email))
         else:
-            cursor.execute('SELECT password_hash FROM users WHERE username = ?', (username,))
+            cursor.execute(AUTH_USER_SQL, (username,))
         row = cursor.fetchone()
-        if row and verify_password(password, row['password_hash']):
-            return True
+    if not row or not verify_password(password, row['password_hash']):
         return False
+    if password_needs_rehash(row['password_hash']):
+        # Upgrade legacy hashes in place now that the plaintext is known to be correct
+        with get_db() as conn:
+            conn.execute(UPDATE_PASSWORD_SQL, (hash_password(password), username))
+    return True
 
 def create_session(username):
     """Create a new session"""
-    import uuid
-    from datetime import timedelta
-    session_id = str(uuid.uuid4())
-    expires_at = datetime.now() + timedelta(hours=24)
+    session_id = secrets.token_urlsafe(18)
+    expires_at = session_timestamp() + SESSION_LIFETIME
     
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO sessions (session_id, username, expires_at)
-            VALUES (?, ?, ?)
-        ''', (session_id, username, expires_at))
+        cursor.execute(INSERT_SESSION_SQL, (session_id, username, expires_at))
     
     return session_id
 
-def verify_session(session_id):
-    """Verify if a session is valid"""
-    with get_db() as conn:
+def get_session(session_id):
+    """Return (username, expires_at) for a valid session, or None"""
+    with get_read_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT username FROM sessions
-            WHERE session_id = ? AND expires_at > datetime('now')
-        ''', (session_id,))
+        cursor.execute(VERIFY_SESSION_SQL, (session_id, session_timestamp()))
         row = cursor.fetchone()
         if row:
-            return row['username']
+            return row['username'], row['expires_at']
         return None
 
+def verify_session(session_id):
+    """Verify if a session is valid"""
+    session = get_session(session_id)
+    return session[0] if session else None
+
 def delete_session(session_id):
     """Delete a session"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+        cursor.execute(DELETE_SESSION_SQL, (session_id,))
 
 def cleanup_expired_sessions():
     """Remove expired sessions"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM sessions WHERE expires_at < datetime('now')")
+        cursor.execute(PURGE_SESSIONS_SQL, (session_timestamp(),))
 
-# Initialize database on import
+def schedule_session_cleanup():
+    """Run cleanup_expired_sessions in the background every SESSION_CLEANUP_INTERVAL seconds"""
+    def run():
+        try:
+            cleanup_expired_sessions()
+        except Exception as e:
+            print(f"Session cleanup failed: {e}")
+        schedule_session_cleanup()
+    timer = threading.Timer(SESSION_CLEANUP_INTERVAL, run)
+    timer.daemon = True
+    timer.start()
+
+# Initialize database on import; an up-to-date database costs a single meta lookup
 if not os.path.exists(DATABASE):
     init_database()
 else:
-    # Check if new tables exist, if not, add them
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    
-    # Check for new tables and add if missing
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='health_tracker_data'")
-    if not cursor.fetchone():
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS health_tracker_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                weight REAL,
-                blood_pressure TEXT,
-                blood_sugar TEXT,
-                sleep_hours REAL,
-                exercise_minutes INTEGER,
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-    
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='diet_plan'")
-    if not cursor.fetchone():
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS diet_plan (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                meal_type TEXT NOT NULL,
-                day TEXT NOT NULL,
-                food_item TEXT NOT NULL,
-                quantity TEXT,
-                calories INTEGER,
-                protein REAL,
-                carbs REAL,
-                fats REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-    
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='exercise_plan'")
-    if not cursor.fetchone():
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS exercise_plan (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                day TEXT NOT NULL,
-                exercise_name TEXT NOT NULL,
-                duration_minutes INTEGER,
-                sets INTEGER,
-                reps INTEGER,
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-    
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='health_goals'")
-    if not cursor.fetchone():
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS health_goals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                week_number INTEGER NOT NULL,
-                week_start_date TEXT,
-                medication_dose TEXT,
-                medication_timing TEXT,
-                target_biomarkers TEXT,
-                diet_focus TEXT,
-                exercise_plan TEXT,
-                sleep_target_hours REAL,
-                stress_management TEXT,
-                key_milestones TEXT,
-                progress_notes TEXT,
-                status TEXT DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-    
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='device_connections'")
-    if not cursor.fetchone():
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS device_connections (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                device_type TEXT NOT NULL,
-                device_name TEXT NOT NULL,
-                account_id TEXT,
-                access_token TEXT,
-                refresh_token TEXT,
-                token_expires_at TIMESTAMP,
-                sync_enabled INTEGER DEFAULT 1,
-                last_sync_at TIMESTAMP,
-                sync_status TEXT DEFAULT 'pending',
-                sync_error TEXT,
-                metadata TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                created_by TEXT
-            )
-        ''')
-    
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='device_sync_log'")
-    if not cursor.fetchone():
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS device_sync_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                device_connection_id INTEGER NOT NULL,
-                sync_type TEXT NOT NULL,
-                records_synced INTEGER DEFAULT 0,
-                sync_started_at TIMESTAMP,
-                sync_completed_at TIMESTAMP,
-                status TEXT DEFAULT 'pending',
-                error_message TEXT,
-                FOREIGN KEY (device_connection_id) REFERENCES device_connections(id)
-            )
-        ''')
-    
-    # Check if email column exists in users table
-    cursor.execute("PRAGMA table_info(users)")
-    columns = [row[1] for row in cursor.fetchall()]
-    if 'email' not in columns:
-        cursor.execute('ALTER TABLE users ADD COLUMN email TEXT')
-    
-    # Ensure vikramsankhala user exists
-    vikram_password = 'vikramsankhala'
-    vikram_password_hash = hashlib.sha256(vikram_password.encode()).hexdigest()
-    cursor.execute('SELECT id FROM users WHERE username = ?', ('vikramsankhala',))
-    if not cursor.fetchone():
-        cursor.execute('''
-            INSERT INTO users (username, email, password_hash)
-            VALUES (?, ?, ?)
-        ''', ('vikramsankhala', 'vikramsankhala@healthtracker.com', vikram_password_hash))
-    else:
-        cursor.execute('UPDATE users SET password_hash = ? WHERE username = ?', (vikram_password_hash, 'vikramsankhala'))
-    
-    conn.commit()
+    conn = connect()
+    if schema_version(conn) != SCHEMA_VERSION:
+        create_schema(conn)
     conn.close()
-
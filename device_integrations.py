@@ -3,9 +3,12 @@ Device Integration Module for Apple Watch and Garmin
 Handles OAuth, API calls, and data synchronization
 """
 import requests
+from requests.adapters import HTTPAdapter
+from http.cookiejar import DefaultCookiePolicy
 import json
 import os
 from datetime import datetime, timedelta
+from collections import defaultdict
 from typing import Dict, List, Optional
 import database
 
@@ -29,6 +32,69 @@ WITHINGS_CLIENT_ID = os.environ.get('WITHINGS_CLIENT_ID', '')
 WITHINGS_CLIENT_SECRET = os.environ.get('WITHINGS_CLIENT_SECRET', '')
 WITHINGS_REDIRECT_URI = os.environ.get('WITHINGS_REDIRECT_URI', 'https://your-app.railway.app/api/devices/withings/callback')
 
+# One keep-alive session shared by every integration, so repeated token exchanges and syncs
+# against the same vendor API reuse TCP/TLS connections instead of handshaking per call
+HTTP_POOL_SIZE = 50  # kept-alive connections per vendor host
+http_session = requests.Session()
+http_session.mount('https://', HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+# Calls are made on behalf of different users, so never carry vendor cookies from one call to the next
+http_session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+# health_tracker_data inserts used by the syncs, one per set of columns a record fills
+EXERCISE_SQL = '''
+    INSERT OR REPLACE INTO health_tracker_data 
+    (date, exercise_minutes, notes, created_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+'''
+NOTES_SQL = '''
+    INSERT OR REPLACE INTO health_tracker_data 
+    (date, notes, created_at)
+    VALUES (?, ?, CURRENT_TIMESTAMP)
+'''
+SLEEP_SQL = '''
+    INSERT OR REPLACE INTO health_tracker_data 
+    (date, sleep_hours, created_at)
+    VALUES (?, ?, CURRENT_TIMESTAMP)
+'''
+WEIGHT_SQL = '''
+    INSERT OR REPLACE INTO health_tracker_data 
+    (date, weight, created_at)
+    VALUES (?, ?, CURRENT_TIMESTAMP)
+'''
+BLOOD_PRESSURE_SQL = '''
+    INSERT OR REPLACE INTO health_tracker_data 
+    (date, blood_pressure, created_at)
+    VALUES (?, ?, CURRENT_TIMESTAMP)
+'''
+
+def save_sync(device_id: int, sync_type: str, rows: Dict[str, List[tuple]], sync_started_at: datetime) -> int:
+    """Insert a sync's collected rows with one executemany per statement, mark the device synced and log it, in one transaction"""
+    records_synced = sum(len(batch) for batch in rows.values())
+    
+    with database.get_db() as conn:
+        cursor = conn.cursor()
+        for sql, batch in rows.items():
+            cursor.executemany(sql, batch)
+        
+        # Update device sync status
+        cursor.execute('''
+            UPDATE device_connections 
+            SET last_sync_at = CURRENT_TIMESTAMP, 
+                sync_status = 'completed',
+                sync_error = NULL
+            WHERE id = ?
+        ''', (device_id,))
+        
+        # Log sync
+        cursor.execute('''
+            INSERT INTO device_sync_log 
+            (device_connection_id, sync_type, records_synced, sync_started_at, sync_completed_at, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (device_id, sync_type, records_synced, sync_started_at.isoformat(), datetime.now().isoformat(), 'completed'))
+    
+    return records_synced
+
+
 class AppleHealthKitIntegration:
     """Apple HealthKit API Integration"""
     
@@ -54,7 +120,7 @@ class AppleHealthKitIntegration:
             # Note: Apple HealthKit requires special handling
             # This is a simplified version - actual implementation requires
             # proper OAuth 2.0 flow with client secret generation
-            response = requests.post(self.token_url, data={
+            response = http_session.post(self.token_url, data={
                 'grant_type': 'authorization_code',
                 'code': code,
                 'redirect_uri': APPLE_REDIRECT_URI,
@@ -89,7 +155,7 @@ class AppleHealthKitIntegration:
             data = {}
             for metric, url in endpoints.items():
                 try:
-                    response = requests.get(url, headers=headers, params={
+                    response = http_session.get(url, headers=headers, params={
                         'start_date': start_date,
                         'end_date': end_date
                     })
@@ -117,66 +183,30 @@ class AppleHealthKitIntegration:
             if not health_data.get('success'):
                 return health_data
             
-            records_synced = 0
+            rows = defaultdict(list)
             
-            with database.get_db() as conn:
-                cursor = conn.cursor()
-                
-                # Sync steps and activity
-                if 'steps' in health_data['data']:
-                    for record in health_data['data']['steps'].get('data', []):
-                        date = record.get('date', datetime.now().date().isoformat())
-                        steps = record.get('value', 0)
-                        
-                        # Update health_tracker_data
-                        cursor.execute('''
-                            INSERT OR REPLACE INTO health_tracker_data 
-                            (date, exercise_minutes, notes, created_at)
-                            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                        ''', (date, steps // 20, f'Apple Watch: {steps} steps'))
-                        records_synced += 1
-                
-                # Sync heart rate
-                if 'heart_rate' in health_data['data']:
-                    for record in health_data['data']['heart_rate'].get('data', []):
-                        date = record.get('date', datetime.now().date().isoformat())
-                        hr = record.get('value', 0)
-                        
-                        cursor.execute('''
-                            INSERT OR REPLACE INTO health_tracker_data 
-                            (date, notes, created_at)
-                            VALUES (?, ?, CURRENT_TIMESTAMP)
-                        ''', (date, f'Apple Watch: Heart Rate {hr} bpm'))
-                        records_synced += 1
-                
-                # Sync sleep
-                if 'sleep' in health_data['data']:
-                    for record in health_data['data']['sleep'].get('data', []):
-                        date = record.get('date', datetime.now().date().isoformat())
-                        sleep_hours = record.get('hours', 0)
-                        
-                        cursor.execute('''
-                            INSERT OR REPLACE INTO health_tracker_data 
-                            (date, sleep_hours, created_at)
-                            VALUES (?, ?, CURRENT_TIMESTAMP)
-                        ''', (date, sleep_hours))
-                        records_synced += 1
-                
-                # Update device sync status
-                cursor.execute('''
-                    UPDATE device_connections 
-                    SET last_sync_at = CURRENT_TIMESTAMP, 
-                        sync_status = 'completed',
-                        sync_error = NULL
-                    WHERE id = ?
-                ''', (device_id,))
-                
-                # Log sync
-                cursor.execute('''
-                    INSERT INTO device_sync_log 
-                    (device_connection_id, sync_type, records_synced, sync_started_at, sync_completed_at, status)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (device_id, 'apple_healthkit', records_synced, start_date.isoformat(), datetime.now().isoformat(), 'completed'))
+            # Sync steps and activity
+            if 'steps' in health_data['data']:
+                for record in health_data['data']['steps'].get('data', []):
+                    date = record.get('date', datetime.now().date().isoformat())
+                    steps = record.get('value', 0)
+                    rows[EXERCISE_SQL].append((date, steps // 20, f'Apple Watch: {steps} steps'))
+            
+            # Sync heart rate
+            if 'heart_rate' in health_data['data']:
+                for record in health_data['data']['heart_rate'].get('data', []):
+                    date = record.get('date', datetime.now().date().isoformat())
+                    hr = record.get('value', 0)
+                    rows[NOTES_SQL].append((date, f'Apple Watch: Heart Rate {hr} bpm'))
+            
+            # Sync sleep
+            if 'sleep' in health_data['data']:
+                for record in health_data['data']['sleep'].get('data', []):
+                    date = record.get('date', datetime.now().date().isoformat())
+                    sleep_hours = record.get('hours', 0)
+                    rows[SLEEP_SQL].append((date, sleep_hours))
+            
+            records_synced = save_sync(device_id, 'apple_healthkit', rows, start_date)
             
             return {'success': True, 'records_synced': records_synced}
         except Exception as e:
@@ -198,7 +228,7 @@ class GarminConnectIntegration:
         # Garmin uses OAuth 1.0a
         try:
             # Step 1: Get request token
-            response = requests.post(self.request_token_url, auth=requests.auth.HTTPBasicAuth(
+            response = http_session.post(self.request_token_url, auth=requests.auth.HTTPBasicAuth(
                 GARMIN_CONSUMER_KEY, GARMIN_CONSUMER_SECRET
             ), data={
                 'oauth_callback': GARMIN_REDIRECT_URI
@@ -222,7 +252,7 @@ class GarminConnectIntegration:
         """Exchange request token for access token"""
         try:
             # OAuth 1.0a flow
-            response = requests.post(self.access_token_url, auth=requests.auth.HTTPBasicAuth(
+            response = http_session.post(self.access_token_url, auth=requests.auth.HTTPBasicAuth(
                 GARMIN_CONSUMER_KEY, GARMIN_CONSUMER_SECRET
             ), data={
                 'oauth_token': oauth_token,
@@ -255,7 +285,7 @@ class GarminConnectIntegration:
             for metric, url in endpoints.items():
                 try:
                     # OAuth 1.0a signing required
-                    response = requests.get(url, auth=requests.auth.HTTPBasicAuth(
+                    response = http_session.get(url, auth=requests.auth.HTTPBasicAuth(
                         access_token, access_token_secret
                     ), params={
                         'startDate': start_date,
@@ -286,68 +316,33 @@ class GarminConnectIntegration:
             if not health_data.get('success'):
                 return health_data
             
-            records_synced = 0
-            
-            with database.get_db() as conn:
-                cursor = conn.cursor()
-                
-                # Sync activities
-                if 'activities' in health_data['data']:
-                    for record in health_data['data']['activities']:
-                        date = record.get('calendarDate', datetime.now().date().isoformat())
-                        steps = record.get('steps', 0)
-                        distance = record.get('distanceInMeters', 0)
-                        calories = record.get('totalKilocalories', 0)
-                        
-                        cursor.execute('''
-                            INSERT OR REPLACE INTO health_tracker_data 
-                            (date, exercise_minutes, notes, created_at)
-                            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                        ''', (date, steps // 20, f'Garmin: {steps} steps, {distance}m, {calories} kcal'))
-                        records_synced += 1
-                
-                # Sync heart rate
-                if 'heart_rate' in health_data['data']:
-                    for record in health_data['data']['heart_rate']:
-                        date = record.get('calendarDate', datetime.now().date().isoformat())
-                        avg_hr = record.get('restingHeartRate', 0)
-                        max_hr = record.get('maxHeartRate', 0)
-                        
-                        cursor.execute('''
-                            INSERT OR REPLACE INTO health_tracker_data 
-                            (date, notes, created_at)
-                            VALUES (?, ?, CURRENT_TIMESTAMP)
-                        ''', (date, f'Garmin: HR avg {avg_hr}, max {max_hr} bpm'))
-                        records_synced += 1
-                
-                # Sync sleep
-                if 'sleep' in health_data['data']:
-                    for record in health_data['data']['sleep']:
-                        date = record.get('calendarDate', datetime.now().date().isoformat())
-                        sleep_hours = record.get('sleepTimeSeconds', 0) / 3600
-                        
-                        cursor.execute('''
-                            INSERT OR REPLACE INTO health_tracker_data 
-                            (date, sleep_hours, created_at)
-                            VALUES (?, ?, CURRENT_TIMESTAMP)
-                        ''', (date, sleep_hours))
-                        records_synced += 1
-                
-                # Update device sync status
-                cursor.execute('''
-                    UPDATE device_connections 
-                    SET last_sync_at = CURRENT_TIMESTAMP, 
-                        sync_status = 'completed',
-                        sync_error = NULL
-                    WHERE id = ?
-                ''', (device_id,))
-                
-                # Log sync
-                cursor.execute('''
-                    INSERT INTO device_sync_log 
-                    (device_connection_id, sync_type, records_synced, sync_started_at, sync_completed_at, status)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (device_id, 'garmin_connect', records_synced, start_date.isoformat(), datetime.now().isoformat(), 'completed'))
+            rows = defaultdict(list)
+            
+            # Sync activities
+            if 'activities' in health_data['data']:
+                for record in health_data['data']['activities']:
+                    date = record.get('calendarDate', datetime.now().date().isoformat())
+                    steps = record.get('steps', 0)
+                    distance = record.get('distanceInMeters', 0)
+                    calories = record.get('totalKilocalories', 0)
+                    rows[EXERCISE_SQL].append((date, steps // 20, f'Garmin: {steps} steps, {distance}m, {calories} kcal'))
+            
+            # Sync heart rate
+            if 'heart_rate' in health_data['data']:
+                for record in health_data['data']['heart_rate']:
+                    date = record.get('calendarDate', datetime.now().date().isoformat())
+                    avg_hr = record.get('restingHeartRate', 0)
+                    max_hr = record.get('maxHeartRate', 0)
+                    rows[NOTES_SQL].append((date, f'Garmin: HR avg {avg_hr}, max {max_hr} bpm'))
+            
+            # Sync sleep
+            if 'sleep' in health_data['data']:
+                for record in health_data['data']['sleep']:
+                    date = record.get('calendarDate', datetime.now().date().isoformat())
+                    sleep_hours = record.get('sleepTimeSeconds', 0) / 3600
+                    rows[SLEEP_SQL].append((date, sleep_hours))
+            
+            records_synced = save_sync(device_id, 'garmin_connect', rows, start_date)
             
             return {'success': True, 'records_synced': records_synced}
         except Exception as e:
@@ -381,7 +376,7 @@ class FitbitIntegration:
             auth_bytes = auth_string.encode('ascii')
             auth_b64 = base64.b64encode(auth_bytes).decode('ascii')
             
-            response = requests.post(self.token_url, 
+            response = http_session.post(self.token_url, 
                 headers={
                     'Authorization': f'Basic {auth_b64}',
                     'Content-Type': 'application/x-www-form-urlencoded'
@@ -417,7 +412,7 @@ class FitbitIntegration:
             data = {}
             for metric, url in endpoints.items():
                 try:
-                    response = requests.get(url, headers=headers)
+                    response = http_session.get(url, headers=headers)
                     if response.status_code == 200:
                         data[metric] = response.json()
                 except:
@@ -433,93 +428,56 @@ class FitbitIntegration:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
             
-            records_synced = 0
+            rows = defaultdict(list)
             
-            with database.get_db() as conn:
-                cursor = conn.cursor()
+            # Fetch each day first; the database is only touched once everything is collected
+            for i in range(days):
+                sync_date = (start_date + timedelta(days=i)).strftime('%Y-%m-%d')
                 
-                # Sync each day
-                for i in range(days):
-                    sync_date = (start_date + timedelta(days=i)).strftime('%Y-%m-%d')
-                    
-                    health_data = self.get_health_data(access_token, sync_date, sync_date)
-                    
-                    if not health_data.get('success'):
-                        continue
-                    
-                    # Sync activities (steps, distance, calories)
-                    if 'activities' in health_data['data']:
-                        activities = health_data['data']['activities']
-                        summary = activities.get('summary', {})
-                        steps = summary.get('steps', 0)
-                        distance = summary.get('distances', [{}])[0].get('distance', 0)
-                        calories = summary.get('caloriesOut', 0)
-                        
-                        if steps > 0:
-                            cursor.execute('''
-                                INSERT OR REPLACE INTO health_tracker_data 
-                                (date, exercise_minutes, notes, created_at)
-                                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                            ''', (sync_date, steps // 20, f'Fitbit: {steps} steps, {distance:.2f} km, {calories} kcal'))
-                            records_synced += 1
-                    
-                    # Sync heart rate
-                    if 'heart_rate' in health_data['data']:
-                        hr_data = health_data['data']['heart_rate']
-                        resting_hr = hr_data.get('activities-heart', [{}])[0].get('value', {}).get('restingHeartRate', 0)
-                        
-                        if resting_hr > 0:
-                            cursor.execute('''
-                                INSERT OR REPLACE INTO health_tracker_data 
-                                (date, notes, created_at)
-                                VALUES (?, ?, CURRENT_TIMESTAMP)
-                            ''', (sync_date, f'Fitbit: Resting HR {resting_hr} bpm'))
-                            records_synced += 1
+                health_data = self.get_health_data(access_token, sync_date, sync_date)
+                
+                if not health_data.get('success'):
+                    continue
+                
+                # Sync activities (steps, distance, calories)
+                if 'activities' in health_data['data']:
+                    activities = health_data['data']['activities']
+                    summary = activities.get('summary', {})
+                    steps = summary.get('steps', 0)
+                    distance = summary.get('distances', [{}])[0].get('distance', 0)
+                    calories = summary.get('caloriesOut', 0)
                     
-                    # Sync sleep
-                    if 'sleep' in health_data['data']:
-                        sleep_data = health_data['data']['sleep']
-                        sleep_summary = sleep_data.get('summary', {})
-                        total_sleep_minutes = sleep_summary.get('totalMinutesAsleep', 0)
-                        sleep_hours = total_sleep_minutes / 60
-                        
-                        if sleep_hours > 0:
-                            cursor.execute('''
-                                INSERT OR REPLACE INTO health_tracker_data 
-                                (date, sleep_hours, created_at)
-                                VALUES (?, ?, CURRENT_TIMESTAMP)
-                            ''', (sync_date, sleep_hours))
-                            records_synced += 1
+                    if steps > 0:
+                        rows[EXERCISE_SQL].append((sync_date, steps // 20, f'Fitbit: {steps} steps, {distance:.2f} km, {calories} kcal'))
+                
+                # Sync heart rate
+                if 'heart_rate' in health_data['data']:
+                    hr_data = health_data['data']['heart_rate']
+                    resting_hr = hr_data.get('activities-heart', [{}])[0].get('value', {}).get('restingHeartRate', 0)
                     
-                    # Sync weight
-                    if 'weight' in health_data['data']:
-                        weight_data = health_data['data']['weight']
-                        weights = weight_data.get('weight', [])
-                        if weights:
-                            latest_weight = weights[-1].get('weight', 0)
-                            if latest_weight > 0:
-                                cursor.execute('''
-                                    INSERT OR REPLACE INTO health_tracker_data 
-                                    (date, weight, created_at)
-                                    VALUES (?, ?, CURRENT_TIMESTAMP)
-                                ''', (sync_date, latest_weight))
-                                records_synced += 1
+                    if resting_hr > 0:
+                        rows[NOTES_SQL].append((sync_date, f'Fitbit: Resting HR {resting_hr} bpm'))
                 
-                # Update device sync status
-                cursor.execute('''
-                    UPDATE device_connections 
-                    SET last_sync_at = CURRENT_TIMESTAMP, 
-                        sync_status = 'completed',
-                        sync_error = NULL
-                    WHERE id = ?
-                ''', (device_id,))
+                # Sync sleep
+                if 'sleep' in health_data['data']:
+                    sleep_data = health_data['data']['sleep']
+                    sleep_summary = sleep_data.get('summary', {})
+                    total_sleep_minutes = sleep_summary.get('totalMinutesAsleep', 0)
+                    sleep_hours = total_sleep_minutes / 60
+                    
+                    if sleep_hours > 0:
+                        rows[SLEEP_SQL].append((sync_date, sleep_hours))
                 
-                # Log sync
-                cursor.execute('''
-                    INSERT INTO device_sync_log 
-                    (device_connection_id, sync_type, records_synced, sync_started_at, sync_completed_at, status)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (device_id, 'fitbit', records_synced, start_date.isoformat(), datetime.now().isoformat(), 'completed'))
+                # Sync weight
+                if 'weight' in health_data['data']:
+                    weight_data = health_data['data']['weight']
+                    weights = weight_data.get('weight', [])
+                    if weights:
+                        latest_weight = weights[-1].get('weight', 0)
+                        if latest_weight > 0:
+                            rows[WEIGHT_SQL].append((sync_date, latest_weight))
+            
+            records_synced = save_sync(device_id, 'fitbit', rows, start_date)
             
             return {'success': True, 'records_synced': records_synced}
         except Exception as e:
@@ -548,7 +506,7 @@ class WithingsIntegration:
     def exchange_code_for_token(self, code: str) -> Dict:
         """Exchange authorization code for access token"""
         try:
-            response = requests.post(self.token_url, data={
+            response = http_session.post(self.token_url, data={
                 'action': 'requesttoken',
                 'grant_type': 'authorization_code',
                 'client_id': WITHINGS_CLIENT_ID,
@@ -633,7 +591,7 @@ class WithingsIntegration:
             data = {}
             for metric, config in endpoints.items():
                 try:
-                    response = requests.post(config['url'], headers=headers, data=config['params'])
+                    response = http_session.post(config['url'], headers=headers, data=config['params'])
                     if response.status_code == 200:
                         result = response.json()
                         if result.get('status') == 0:
@@ -661,119 +619,83 @@ class WithingsIntegration:
             if not health_data.get('success'):
                 return health_data
             
-            records_synced = 0
-            
-            with database.get_db() as conn:
-                cursor = conn.cursor()
-                
-                # Sync weight
-                if 'weight' in health_data['data']:
-                    measures = health_data['data']['weight'].get('measuregrps', [])
-                    for measure_group in measures:
-                        date = datetime.fromtimestamp(measure_group.get('date', 0)).date().isoformat()
-                        measures_list = measure_group.get('measures', [])
-                        for measure in measures_list:
-                            if measure.get('type') == 1:  # Weight
-                                weight_kg = measure.get('value', 0) * (10 ** measure.get('unit', 0))
-                                if weight_kg > 0:
-                                    cursor.execute('''
-                                        INSERT OR REPLACE INTO health_tracker_data 
-                                        (date, weight, created_at)
-                                        VALUES (?, ?, CURRENT_TIMESTAMP)
-                                    ''', (date, weight_kg))
-                                    records_synced += 1
-                
-                # Sync blood pressure
-                if 'blood_pressure' in health_data['data']:
-                    measures = health_data['data']['blood_pressure'].get('measuregrps', [])
-                    for measure_group in measures:
-                        date = datetime.fromtimestamp(measure_group.get('date', 0)).date().isoformat()
-                        measures_list = measure_group.get('measures', [])
-                        systolic = 0
-                        diastolic = 0
-                        for measure in measures_list:
-                            if measure.get('type') == 9:  # Systolic
-                                systolic = measure.get('value', 0)
-                            elif measure.get('type') == 10:  # Diastolic
-                                diastolic = measure.get('value', 0)
+            rows = defaultdict(list)
+            
+            # Sync weight
+            if 'weight' in health_data['data']:
+                measures = health_data['data']['weight'].get('measuregrps', [])
+                for measure_group in measures:
+                    date = datetime.fromtimestamp(measure_group.get('date', 0)).date().isoformat()
+                    measures_list = measure_group.get('measures', [])
+                    for measure in measures_list:
+                        if measure.get('type') == 1:  # Weight
+                            weight_kg = measure.get('value', 0) * (10 ** measure.get('unit', 0))
+                            if weight_kg > 0:
+                                rows[WEIGHT_SQL].append((date, weight_kg))
+            
+            # Sync blood pressure
+            if 'blood_pressure' in health_data['data']:
+                measures = health_data['data']['blood_pressure'].get('measuregrps', [])
+                for measure_group in measures:
+                    date = datetime.fromtimestamp(measure_group.get('date', 0)).date().isoformat()
+                    measures_list = measure_group.get('measures', [])
+                    systolic = 0
+                    diastolic = 0
+                    for measure in measures_list:
+                        if measure.get('type') == 9:  # Systolic
+                            systolic = measure.get('value', 0)
+                        elif measure.get('type') == 10:  # Diastolic
+                            diastolic = measure.get('value', 0)
+                    
+                    if systolic > 0 and diastolic > 0:
+                        rows[BLOOD_PRESSURE_SQL].append((date, f'{systolic}/{diastolic}'))
+            
+            # Sync activity
+            if 'activity' in health_data['data']:
+                activities = health_data['data']['activity'].get('activities', [])
+                for activity in activities:
+                    date = activity.get('date', '')
+                    if date:
+                        date_obj = datetime.strptime(date, '%Y%m%d').date().isoformat()
+                        steps = activity.get('steps', 0)
+                        distance = activity.get('distance', 0)
+                        calories = activity.get('calories', 0)
                         
-                        if systolic > 0 and diastolic > 0:
-                            cursor.execute('''
-                                INSERT OR REPLACE INTO health_tracker_data 
-                                (date, blood_pressure, created_at)
-                                VALUES (?, ?, CURRENT_TIMESTAMP)
-                            ''', (date, f'{systolic}/{diastolic}'))
-                            records_synced += 1
-                
-                # Sync activity
-                if 'activity' in health_data['data']:
-                    activities = health_data['data']['activity'].get('activities', [])
-                    for activity in activities:
-                        date = activity.get('date', '')
-                        if date:
-                            date_obj = datetime.strptime(date, '%Y%m%d').date().isoformat()
-                            steps = activity.get('steps', 0)
-                            distance = activity.get('distance', 0)
-                            calories = activity.get('calories', 0)
-                            
-                            if steps > 0:
-                                cursor.execute('''
-                                    INSERT OR REPLACE INTO health_tracker_data 
-                                    (date, exercise_minutes, notes, created_at)
-                                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                                ''', (date_obj, steps // 20, f'Withings: {steps} steps, {distance}m, {calories} kcal'))
-                                records_synced += 1
-                
-                # Sync sleep
-                if 'sleep' in health_data['data']:
-                    sleep_data = health_data['data']['sleep'].get('series', [])
-                    for sleep_record in sleep_data:
-                        date = sleep_record.get('date', '')
-                        if date:
-                            date_obj = datetime.strptime(date, '%Y%m%d').date().isoformat()
-                            total_sleep_seconds = sleep_record.get('total_sleep_time', 0)
-                            sleep_hours = total_sleep_seconds / 3600
-                            
-                            if sleep_hours > 0:
-                                cursor.execute('''
-                                    INSERT OR REPLACE INTO health_tracker_data 
-                                    (date, sleep_hours, created_at)
-                                    VALUES (?, ?, CURRENT_TIMESTAMP)
-                                ''', (date_obj, sleep_hours))
-                                records_synced += 1
-                
-                # Update device sync status
-                cursor.execute('''
-                    UPDATE device_connections 
-                    SET last_sync_at = CURRENT_TIMESTAMP, 
-                        sync_status = 'completed',
-                        sync_error = NULL
-                    WHERE id = ?
-                ''', (device_id,))
-                
-                # Log sync
-                cursor.execute('''
-                    INSERT INTO device_sync_log 
-                    (device_connection_id, sync_type, records_synced, sync_started_at, sync_completed_at, status)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (device_id, 'withings', records_synced, start_date.isoformat(), datetime.now().isoformat(), 'completed'))
+                        if steps > 0:
+                            rows[EXERCISE_SQL].append((date_obj, steps // 20, f'Withings: {steps} steps, {distance}m, {calories} kcal'))
+            
+            # Sync sleep
+            if 'sleep' in health_data['data']:
+                sleep_data = health_data['data']['sleep'].get('series', [])
+                for sleep_record in sleep_data:
+                    date = sleep_record.get('date', '')
+                    if date:
+                        date_obj = datetime.strptime(date, '%Y%m%d').date().isoformat()
+                        total_sleep_seconds = sleep_record.get('total_sleep_time', 0)
+                        sleep_hours = total_sleep_seconds / 3600
+                        
+                        if sleep_hours > 0:
+                            rows[SLEEP_SQL].append((date_obj, sleep_hours))
+            
+            records_synced = save_sync(device_id, 'withings', rows, start_date)
             
             return {'success': True, 'records_synced': records_synced}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
 
+# Integrations only hold endpoint URLs, so one instance of each is shared across requests
+INTEGRATIONS = {
+    'apple_watch': AppleHealthKitIntegration(),
+    'garmin': GarminConnectIntegration(),
+    'fitbit': FitbitIntegration(),
+    'withings': WithingsIntegration(),
+}
+INTEGRATIONS['apple'] = INTEGRATIONS['apple_watch']
+
 def get_device_integration(device_type: str):
-    """Factory function to get device integration instance"""
-    device_type_lower = device_type.lower()
-    if device_type_lower == 'apple_watch' or device_type_lower == 'apple':
-        return AppleHealthKitIntegration()
-    elif device_type_lower == 'garmin':
-        return GarminConnectIntegration()
-    elif device_type_lower == 'fitbit':
-        return FitbitIntegration()
-    elif device_type_lower == 'withings':
-        return WithingsIntegration()
-    else:
+    """Factory function to get the shared device integration instance"""
+    integration = INTEGRATIONS.get(device_type.lower())
+    if integration is None:
         raise ValueError(f"Unsupported device type: {device_type}")
-
+    return integration
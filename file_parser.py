@@ -180,14 +180,11 @@ def parse_all_files():
         print(f"Content directory not found: {CONTENT_DIR}")
         return
     
-    files = os.listdir(CONTENT_DIR)
+    # scandir's entries carry the file type, so there is no extra stat per file
+    with os.scandir(CONTENT_DIR) as entries:
+        files = [(entry.name, entry.path) for entry in entries if entry.is_file()]
     
-    for filename in files:
-        filepath = os.path.join(CONTENT_DIR, filename)
-        
-        if not os.path.isfile(filepath):
-            continue
-        
+    for filename, filepath in files:
         if filename == 'Weekly Health Tracker.xlsx':
             print(f"Parsing: {filename}")
             parse_health_tracker(filepath)
@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration (loaded automatically from the working directory).
+The app is I/O-bound (SQLite, Content/ directory, OpenAI HTTPS calls), so
+gevent workers multiplex many in-flight requests per process.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+worker_class = 'gevent'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_connections = 1000
+# Report generation can take a while before the first token arrives
+timeout = 120
+
+
+def on_starting(server):
+    """Prepare the database once in the master instead of in every worker"""
+    import database
+    import file_parser
+    import health_plan_creator
+    database.init_database()
+    # Like the in-app startup path, a bad file or plan only logs a warning; the server still boots
+    try:
+        file_parser.parse_all_files()
+    except Exception as e:
+        server.log.warning("Could not parse files on startup: %s", e)
+    try:
+        health_plan_creator.ensure_health_plan()
+    except Exception as e:
+        server.log.warning("Could not initialize health plan: %s", e)
+    os.environ['STARTUP_DATA_READY'] = '1'
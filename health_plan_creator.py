@@ -254,6 +254,16 @@ def create_health_plan():
         conn.commit()
         print(f"Created 16-week health plan starting from {start_date.strftime('%Y-%m-%d')}")
 
+def ensure_health_plan():
+    """Create the health plan if the database does not have one yet"""
+    with database.get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) as count FROM health_goals')
+        count = cursor.fetchone()['count']
+    if count == 0:
+        create_health_plan()
+        print("Health plan initialized")
+
 if __name__ == '__main__':
     create_health_plan()
 
@@ -6,5 +6,6 @@ echo Starting Health Tracker...
 echo Open your browser to http://localhost:5000
 echo Press Ctrl+C to stop the server
 echo.
+set FLASK_ENV=development
 python app.py
 
@@ -0,0 +1,12 @@
+"""
+WSGI entry point for production servers.
+Patches the standard library for gevent before the app (and the OpenAI
+client's sockets) are imported, so blocking I/O yields to other greenlets.
+"""
+from gevent import monkey
+monkey.patch_all()
+
+from app import app  # noqa: E402
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)